@@ -0,0 +1,97 @@
+"""
+Micro-benchmark: streaming indexer.get_tags_from_xmp against the previous
+ET.parse + findall implementation, on sidecars with and without a large
+embedded base64 thumbnail, the latter also with the thumbnail broken into
+76-character lines by &#xA; the way XMP writers store it.
+
+    python benchmarks/bench_indexer.py [--tags 40] [--payload-kb 512] [--repeat 200]
+"""
+import os
+import sys
+import json
+import base64
+import timeit
+import argparse
+import tempfile
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import indexer
+
+XMP_TEMPLATE = """<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>
+<x:xmpmeta xmlns:x="adobe:ns:meta/">
+ <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+  <rdf:Description rdf:about="" xmlns:dc="http://purl.org/dc/elements/1.1/"
+    xmlns:xmp="http://ns.adobe.com/xap/1.0/" xmlns:xmpGImg="http://ns.adobe.com/xap/1.0/g/img/">
+   <xmp:Thumbnails><rdf:Alt><rdf:li rdf:parseType="Resource">
+    <xmpGImg:image>{payload}</xmpGImg:image>
+   </rdf:li></rdf:Alt></xmp:Thumbnails>
+   <dc:subject><rdf:Bag>
+{tags}
+   </rdf:Bag></dc:subject>
+  </rdf:Description>
+ </rdf:RDF>
+</x:xmpmeta>
+<?xpacket end="w"?>
+"""
+
+def dom_get_tags_from_xmp(xmp_path):
+    """The pre-streaming implementation, kept here as the baseline."""
+    tree = ET.parse(xmp_path)
+    root = tree.getroot()
+    ns = {
+        'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+        'dc': 'http://purl.org/dc/elements/1.1/'
+    }
+    tags = []
+    for description in root.findall('.//rdf:Description', ns):
+        subject = description.find('dc:subject', ns)
+        if subject is not None:
+            bag = subject.find('rdf:Bag', ns)
+            if bag is not None:
+                for li in bag.findall('rdf:li', ns):
+                    if li.text:
+                        tags.append(li.text.lower())
+    return tags
+
+def write_sidecar(path, n_tags, payload_kb, line_breaks=False):
+    payload = base64.b64encode(os.urandom(payload_kb * 768)).decode("ascii") if payload_kb else ""
+    if line_breaks:
+        payload = "&#xA;".join(payload[i:i + 76] for i in range(0, len(payload), 76))
+    tags = "\n".join(f"    <rdf:li>Tag {i}</rdf:li>" for i in range(n_tags))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(XMP_TEMPLATE.format(payload=payload, tags=tags))
+
+def peak_memory(fn, path):
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tags", type=int, default=40)
+    parser.add_argument("--payload-kb", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = (("plain", 0, False), ("thumbnail", args.payload_kb, False), ("thumbnail_lines", args.payload_kb, True))
+        for label, payload_kb, line_breaks in cases:
+            path = os.path.join(tmp, f"{label}.xmp")
+            write_sidecar(path, args.tags, payload_kb, line_breaks)
+            assert indexer.get_tags_from_xmp(path) == dom_get_tags_from_xmp(path)
+            row = {"file_bytes": os.path.getsize(path)}
+            for name, fn in (("dom", dom_get_tags_from_xmp), ("streaming", indexer.get_tags_from_xmp)):
+                seconds = min(timeit.repeat(lambda: fn(path), number=args.repeat, repeat=3)) / args.repeat
+                row[f"{name}_us"] = round(seconds * 1e6, 1)
+                row[f"{name}_peak_kb"] = round(peak_memory(fn, path) / 1024, 1)
+            results[label] = row
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
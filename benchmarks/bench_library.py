@@ -0,0 +1,195 @@
+"""
+End-to-end benchmark on a generated model library.
+
+Builds a synthetic library (nested folders, hidden directories that the
+scanner must skip, XMP sidecars with N tags, optionally with a large
+embedded thumbnail, and pre-existing config.orynt3d files), then times
+each stage on its own and the whole pipeline:
+
+    scan       scanner.find_xmp_files
+    parse      indexer.get_tags_from_xmp over every sidecar
+    map        mapper.map_tags over every tag list
+    semantic   semantic.semantic_map_batch, with a stub embedding model
+    generate   generator.generate_config for every folder, first and unchanged runs
+    pipeline   core.pipeline.Pipeline over the library, one item per folder
+
+Everything runs offline: the stub model hashes words into vectors, and the
+embedding cache and attribute matrix live in the temporary directory.
+Results are written as JSON (with the git commit) so runs can be compared.
+
+    python benchmarks/bench_library.py [--folders 2000] [--output bench_library.json]
+"""
+import os
+import sys
+import json
+import time
+import base64
+import random
+import shutil
+import hashlib
+import platform
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench_indexer import XMP_TEMPLATE
+
+STUB_MODEL_NAME = "bench-stub-hashing"
+WORDS = ["elf", "dwarf", "orc", "rocky", "base", "metal", "armor", "sword", "flowing", "robes", "shadow",
+         "mounted", "horse", "noble", "ethereal", "spirit", "tribal", "fire", "storm", "wizard", "staff",
+         "ancient", "dragon", "crown", "cloak", "bow", "hooded", "giant", "axe", "female", "male", "undead"]
+
+class StubEmbeddingModel:
+    """Deterministic bag-of-words hashing model with the sentence-transformers encode() signature."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.replace(":", " ").split():
+                h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+                vectors[row, h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        return vectors
+
+def random_tag(rng, vocabulary):
+    if rng.random() < 0.4:
+        return rng.choice(vocabulary)
+    return " ".join(rng.sample(WORDS, rng.randint(1, 3)))
+
+def generate_library(root, args, attributes_map):
+    """Create the library under root; returns the number of sidecars written (hidden ones excluded)."""
+    rng = random.Random(args.seed)
+    vocabulary = [v for values in attributes_map.values() for v in values]
+    payload = base64.b64encode(os.urandom(args.payload_kb * 768)).decode("ascii") if args.payload_kb else ""
+    sidecars = 0
+    for i in range(args.folders):
+        parts = [f"group{rng.randrange(args.fanout)}" for _ in range(rng.randint(1, args.depth))]
+        folder = os.path.join(root, *parts, f"model{i:06d}")
+        os.makedirs(folder, exist_ok=True)
+        for j in range(args.sidecars_per_folder):
+            tags = "\n".join(f"    <rdf:li>{random_tag(rng, vocabulary)}</rdf:li>" for _ in range(args.tags))
+            body = payload if rng.random() < args.payload_fraction else ""
+            with open(os.path.join(folder, f"render{j}.xmp"), "w", encoding="utf-8") as f:
+                f.write(XMP_TEMPLATE.format(payload=body, tags=tags))
+            sidecars += 1
+        if rng.random() < args.hidden_fraction:
+            hidden = os.path.join(folder, ".thumbnails")
+            os.makedirs(hidden, exist_ok=True)
+            with open(os.path.join(hidden, "cache.xmp"), "w", encoding="utf-8") as f:
+                f.write(XMP_TEMPLATE.format(payload="", tags="    <rdf:li>hidden</rdf:li>"))
+        if rng.random() < args.existing_fraction:
+            key = rng.choice(sorted(attributes_map))
+            attributes = [{"key": key, "value": rng.choice(attributes_map[key])}]
+            with open(os.path.join(folder, "config.orynt3d"), "w", encoding="utf-8") as f:
+                json.dump({"modelmeta": {"attributes": attributes}}, f, indent=2)
+    return sidecars
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def stage(seconds, items):
+    return {"seconds": round(seconds, 4), "items": items, "per_second": round(items / seconds, 1) if seconds else None}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(args, tmp):
+    # Keep the cache and the attribute matrix away from the real ones before anything loads them
+    os.environ["ORYNT3D_CACHE_DIR"] = os.path.join(tmp, "cache")
+    from core import scanner, indexer, mapper, generator, semantic
+    from core.pipeline import Pipeline
+    import main
+
+    yaml_path = os.path.join(tmp, "attributes.yaml")
+    shutil.copyfile(os.path.join(REPO_ROOT, "attributes.yaml"), yaml_path)
+    mapper.tag_mapper = mapper.TagMapper(yaml_path)
+    semantic.set_model(StubEmbeddingModel(args.dim), STUB_MODEL_NAME)
+
+    root = os.path.join(tmp, "library")
+    sidecars, seconds = timed(lambda: generate_library(root, args, mapper.load_attribute_yaml()))
+    results = {"generate_library": stage(seconds, sidecars)}
+
+    xmp_files, seconds = timed(lambda: scanner.find_xmp_files(root))
+    results["scan"] = stage(seconds, len(xmp_files))
+    if len(xmp_files) != sidecars:
+        results["scan"]["error"] = f"found {len(xmp_files)} sidecars, expected {sidecars}"
+
+    tag_lists, seconds = timed(lambda: [indexer.get_tags_from_xmp(p) for p in xmp_files])
+    results["parse"] = stage(seconds, len(xmp_files))
+
+    mapped, seconds = timed(lambda: [mapper.map_tags(tags) for tags in tag_lists])
+    results["map"] = stage(seconds, len(tag_lists))
+
+    _, seconds = timed(lambda: semantic.semantic_map_batch(tag_lists, batch_size=args.batch_size))
+    results["semantic_cold"] = stage(seconds, len(tag_lists))
+    _, seconds = timed(lambda: semantic.semantic_map_batch(tag_lists, batch_size=args.batch_size))
+    results["semantic_warm"] = stage(seconds, len(tag_lists))
+
+    folders = {}
+    for xmp_file, attributes in zip(xmp_files, mapped):
+        folders.setdefault(os.path.dirname(xmp_file), attributes)
+    for label in ("generate_first", "generate_unchanged"):
+        written, seconds = timed(lambda: sum(generator.generate_config(f, a) for f, a in folders.items()))
+        results[label] = stage(seconds, len(folders))
+        results[label]["written"] = written
+
+    pipeline = Pipeline(main.load_existing_attributes, workers=args.workers, batch_size=args.batch_size)
+    _, seconds = timed(lambda: pipeline.run(scanner.iter_folder_sidecars(root)))
+    results["pipeline"] = stage(seconds, pipeline.stats["write"].items)
+    results["pipeline"]["stages"] = {
+        name: stage(stats.busy, stats.items) for name, stats in pipeline.stats.items()
+    }
+    semantic.flush()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--folders", type=int, default=2000)
+    parser.add_argument("--sidecars-per-folder", type=int, default=1)
+    parser.add_argument("--depth", type=int, default=3, help="maximum group folders above each model folder")
+    parser.add_argument("--fanout", type=int, default=8, help="distinct group folder names per level")
+    parser.add_argument("--tags", type=int, default=30)
+    parser.add_argument("--payload-kb", type=int, default=256, help="size of the embedded thumbnail")
+    parser.add_argument("--payload-fraction", type=float, default=0.1, help="share of sidecars with a thumbnail")
+    parser.add_argument("--hidden-fraction", type=float, default=0.2)
+    parser.add_argument("--existing-fraction", type=float, default=0.3, help="share of folders with a config already")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dir", help="build the library here and keep it, instead of a temporary directory")
+    parser.add_argument("--output", default="bench_library.json")
+    args = parser.parse_args()
+
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+        stages = run(args, args.dir)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            stages = run(args, tmp)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("dir", "output")},
+        "stages": stages,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark the compiled TagMapper against the previous nested-loop
+map_tags, using the real attributes.yaml values plus a synthetic
+phrase_map of configurable size.
+
+    python benchmarks/bench_mapper.py [--phrases 5000] [--sidecars 2000] [--tags 40]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from core.mapper import TagMapper
+
+WORDS = ["elf", "dwarf", "rocky", "base", "metal", "armor", "sword", "flowing", "robes", "shadow",
+         "mounted", "horse", "noble", "attire", "ethereal", "spirit", "tribal", "gear", "fire", "storm",
+         "wizard", "staff", "ancient", "dragon", "crown", "cloak", "bow", "hooded", "giant", "axe"]
+
+def legacy_map_tags(mapper, tags):
+    """The pre-compilation implementation, kept here as the baseline."""
+    result = {}
+    lower_tags = [t.lower() for t in tags]
+    for key, values in mapper.attributes_map.items():
+        for val in values:
+            if val.lower() in lower_tags:
+                result.setdefault(key, []).append(val)
+    for tag in lower_tags:
+        for phrase, mapping in mapper.phrase_map.items():
+            if phrase in tag:
+                key = mapping.get("key")
+                value = mapping.get("value")
+                if key and value:
+                    result.setdefault(key, []).append(value)
+    return result
+
+def random_phrase(rng):
+    return " ".join(rng.sample(WORDS, rng.randint(1, 3)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--phrases", type=int, default=5000)
+    parser.add_argument("--sidecars", type=int, default=2000)
+    parser.add_argument("--tags", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mapper = TagMapper(os.path.join(REPO_ROOT, "attributes.yaml"))
+    keys = list(mapper.attributes_map)
+    phrase_map = dict(mapper.phrase_map)
+    while len(phrase_map) < args.phrases:
+        key = rng.choice(keys)
+        phrase_map[random_phrase(rng)] = {"key": key, "value": rng.choice(mapper.attributes_map[key])}
+    mapper.phrase_map = phrase_map
+    mapper.compile()
+
+    vocabulary = [v for values in mapper.attributes_map.values() for v in values]
+    tag_lists = [
+        [rng.choice(vocabulary) if rng.random() < 0.3 else random_phrase(rng) for _ in range(args.tags)]
+        for _ in range(args.sidecars)
+    ]
+
+    start = time.perf_counter()
+    legacy = [legacy_map_tags(mapper, tags) for tags in tag_lists]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = mapper.map_tags_many(tag_lists)
+    compiled_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "phrases": len(phrase_map),
+        "sidecars": args.sidecars,
+        "tags_per_sidecar": args.tags,
+        "identical_results": legacy == compiled,
+        "legacy_ms_per_sidecar": round(legacy_seconds / args.sidecars * 1e3, 3),
+        "compiled_ms_per_sidecar": round(compiled_seconds / args.sidecars * 1e3, 3),
+        "speedup": round(legacy_seconds / compiled_seconds, 1) if compiled_seconds else None,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
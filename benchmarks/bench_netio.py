@@ -0,0 +1,110 @@
+"""
+Benchmark core.netio on a simulated network share.
+
+Builds a small library locally and reads it the way a run does (list every
+directory, then read each folder's sidecars and config) through a
+RemoteIO whose latency shim sleeps before every operation, as a round trip
+to the share would. Configurations compared:
+
+    serial      concurrency 1, no read-ahead (one round trip at a time)
+    parallel    bounded concurrency, no read-ahead
+    read-ahead  bounded concurrency plus read-ahead of upcoming folders
+
+A --fail-rate above zero also injects transient errors to exercise the
+retries; tags read must match a direct local read in every configuration.
+With --chunk N folders are taken N at a time and prefetched before being
+read, as main.py's sequential loop does with --batch-size.
+
+    python benchmarks/bench_netio.py [--folders 300] [--latency-ms 5] [--concurrency 16] [--read-ahead 32] [--chunk 0]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from itertools import islice
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_indexer import XMP_TEMPLATE
+from core import scanner, indexer
+from core.netio import RemoteIO
+
+WORDS = ["elf", "dwarf", "orc", "rocky base", "metal armor", "sword", "flowing robes", "wizard", "dragon"]
+
+def generate_library(root, folders, sidecars_per_folder, tags, seed):
+    rng = random.Random(seed)
+    for i in range(folders):
+        folder = os.path.join(root, f"group{i % 10}", f"model{i:05d}")
+        os.makedirs(folder, exist_ok=True)
+        for j in range(sidecars_per_folder):
+            body = "\n".join(f"    <rdf:li>{rng.choice(WORDS)}</rdf:li>" for _ in range(tags))
+            with open(os.path.join(folder, f"render{j}.xmp"), "w", encoding="utf-8") as f:
+                f.write(XMP_TEMPLATE.format(payload="", tags=body))
+        if i % 3 == 0:
+            with open(os.path.join(folder, "config.orynt3d"), "w", encoding="utf-8") as f:
+                json.dump({"modelmeta": {"attributes": [{"key": "race", "value": "elf"}]}}, f)
+
+def read_library(root, remote, chunk=0):
+    """Scan and read everything, chunk folders at a time if given; returns {folder: (tags, attributes)}."""
+    result = {}
+    folders = remote.read_ahead(sorted(scanner.iter_folder_sidecars(root, remote.concurrency, remote.scan_dir)))
+    while True:
+        batch = list(islice(folders, chunk or 1))
+        if not batch:
+            return result
+        if chunk:
+            remote.prefetch(batch)
+        for folder, xmp_files in batch:
+            _, tags, _ = indexer.get_folder_tags(xmp_files, remote.read_tags)
+            result[folder] = (tags, remote.load_existing_attributes(folder))
+            remote.release(folder)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--folders", type=int, default=300)
+    parser.add_argument("--sidecars-per-folder", type=int, default=2)
+    parser.add_argument("--tags", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated round trip per operation")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of operations failing transiently")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--read-ahead", type=int, default=32)
+    parser.add_argument("--chunk", type=int, default=0, help="take folders this many at a time, 0 for one by one")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configurations = {
+        "serial": (1, 0),
+        "parallel": (args.concurrency, 0),
+        "read-ahead": (args.concurrency, args.read_ahead),
+    }
+    with tempfile.TemporaryDirectory() as root:
+        generate_library(root, args.folders, args.sidecars_per_folder, args.tags, args.seed)
+        expected = read_library(root, RemoteIO(concurrency=8, read_ahead=0))
+
+        results = {"folders": args.folders, "chunk": args.chunk, "latency_ms": args.latency_ms, "fail_rate": args.fail_rate, "runs": {}}
+        for name, (concurrency, read_ahead) in configurations.items():
+            remote = RemoteIO(concurrency=concurrency, read_ahead=read_ahead, backoff=0.01,
+                              latency=args.latency_ms / 1000, fail_rate=args.fail_rate)
+            start = time.perf_counter()
+            try:
+                got = read_library(root, remote, args.chunk)
+            finally:
+                remote.close()
+            seconds = time.perf_counter() - start
+            results["runs"][name] = {
+                "seconds": round(seconds, 3),
+                "folders_per_second": round(args.folders / seconds, 1),
+                "operations": remote.operations,
+                "retried": remote.retried,
+                "identical": got == expected,
+            }
+        serial = results["runs"]["serial"]["seconds"]
+        for run in results["runs"].values():
+            run["speedup"] = round(serial / run["seconds"], 2)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
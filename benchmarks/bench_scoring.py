@@ -0,0 +1,134 @@
+"""
+Benchmark the NumPy AttributeScorer (float32, float16 and int8 storage)
+against the previous torch path, util.pytorch_cos_sim followed by .max(1).
+
+Embeddings are synthetic by default: attribute vectors are random, and each
+tag is a noisy copy of one of them so scores span the threshold. With
+--model the real attributes.yaml phrases and a sample tag list are encoded
+by sentence-transformers instead. The torch baseline is skipped when torch
+is not installed; agreement is then measured against float32 NumPy.
+
+    python benchmarks/bench_scoring.py [--tags 20000] [--attributes 2000] [--dim 384] [--model]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from core.scoring import AttributeScorer, PRECISIONS, DEFAULT_THRESHOLD
+
+SAMPLE_TAGS = ["elf", "rocky base", "sword", "metal armor", "flowing robes", "mounted knight", "fire mage",
+               "undead warrior", "tiny goblin", "dragon rider", "hooded rogue", "ice queen", "storm giant"]
+
+def synthetic_embeddings(n_tags, n_attributes, dim, seed):
+    rng = np.random.default_rng(seed)
+    attributes = rng.standard_normal((n_attributes, dim)).astype(np.float32)
+    targets = rng.integers(0, n_attributes, n_tags)
+    noise = rng.uniform(0.3, 2.0, (n_tags, 1)).astype(np.float32)
+    tags = attributes[targets] + noise * rng.standard_normal((n_tags, dim)).astype(np.float32)
+    lookup = [(f"key{i % 20}", f"value{i}") for i in range(n_attributes)]
+    return tags, attributes, lookup
+
+def model_embeddings(n_tags):
+    from core import semantic
+    attribute_lookup, attributes = semantic.load_attribute_index()
+    tags = (SAMPLE_TAGS * (n_tags // len(SAMPLE_TAGS) + 1))[:n_tags]
+    return semantic.encode_texts(tags), np.asarray(attributes, dtype=np.float32), attribute_lookup
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def torch_top1(tags, attributes, batch_size):
+    import torch
+    from sentence_transformers import util
+    attribute_tensor = torch.from_numpy(attributes)
+    idx, scores = [], []
+    for start in range(0, len(tags), batch_size):
+        top_scores, top_idx = util.pytorch_cos_sim(torch.from_numpy(tags[start:start + batch_size]), attribute_tensor).max(1)
+        idx.append(top_idx.numpy())
+        scores.append(top_scores.numpy())
+    return np.concatenate(idx), np.concatenate(scores), attribute_tensor.element_size() * attribute_tensor.nelement()
+
+def numpy_top1(scorer, tags, batch_size):
+    idx, scores = [], []
+    for start in range(0, len(tags), batch_size):
+        top_idx, top_scores = scorer.top_k(tags[start:start + batch_size], 1)
+        idx.append(top_idx[:, 0])
+        scores.append(top_scores[:, 0])
+    return np.concatenate(idx), np.concatenate(scores)
+
+def agreement(reference, candidate, threshold):
+    ref_idx, ref_scores = reference[:2]
+    idx, scores = candidate[:2]
+    # A tag agrees when both paths make the same decision: the same attribute above threshold, or nothing
+    ref_hit = ref_scores > threshold
+    hit = scores > threshold
+    same = (ref_hit == hit) & (~ref_hit | (ref_idx == idx))
+    return {
+        "top1_identical": round(float((ref_idx == idx).mean()), 5),
+        "decision_identical": round(float(same.mean()), 5),
+        "max_score_error": round(float(np.abs(ref_scores - scores).max()), 5),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tags", type=int, default=20000)
+    parser.add_argument("--attributes", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", action="store_true", help="encode real phrases with sentence-transformers")
+    args = parser.parse_args()
+
+    if args.model:
+        tags, attributes, lookup = model_embeddings(args.tags)
+    else:
+        tags, attributes, lookup = synthetic_embeddings(args.tags, args.attributes, args.dim, args.seed)
+
+    results = {"tags": len(tags), "attributes": len(attributes), "dim": attributes.shape[1], "engines": {}}
+    reference = None
+    try:
+        torch_result, seconds = timed(lambda: torch_top1(tags, attributes, args.batch_size), args.repeat)
+        reference = torch_result
+        results["reference"] = "torch"
+        results["engines"]["torch"] = {
+            "ms_per_1k_tags": round(seconds / len(tags) * 1e6, 3),
+            "matrix_bytes": torch_result[2],
+        }
+    except ImportError:
+        results["reference"] = "numpy-float32"
+
+    for precision in PRECISIONS:
+        tracemalloc.start()
+        scorer = AttributeScorer(attributes, lookup, precision)
+        numpy_result, seconds = timed(lambda: numpy_top1(scorer, tags, args.batch_size), args.repeat)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if reference is None:
+            reference = numpy_result
+        entry = {
+            "ms_per_1k_tags": round(seconds / len(tags) * 1e6, 3),
+            "matrix_bytes": scorer.nbytes,
+            "peak_traced_bytes": peak,
+        }
+        entry.update(agreement(reference, numpy_result, DEFAULT_THRESHOLD))
+        results["engines"][f"numpy-{precision}"] = entry
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
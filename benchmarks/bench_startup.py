@@ -0,0 +1,80 @@
+"""
+Startup-time benchmark for main.py and the GUIs.
+
+Each measurement runs in a fresh interpreter so module caches don't leak
+between runs. "cold" uses an empty embedding cache and no saved attribute
+matrix; "warm" reuses what the cold run left behind.
+
+    python benchmarks/bench_startup.py [--repeat 3]
+"""
+import os
+import sys
+import glob
+import json
+import argparse
+import tempfile
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPETS = {
+    "import main": "import main",
+    "import gui": "import gui",
+    "import core.gui_manual_review": "import core.gui_manual_review",
+}
+
+FIRST_LOOKUP_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import main
+from core import semantic
+t1 = time.perf_counter()
+semantic.semantic_map(["elf", "rocky base", "sword"])
+t2 = time.perf_counter()
+print(f"{t1 - t0:.6f} {t2 - t1:.6f}")
+"""
+
+def run_snippet(code, env):
+    timed = f"import time\n_t = time.perf_counter()\n{code}\nprint(f'{{time.perf_counter() - _t:.6f}}')"
+    proc = subprocess.run([sys.executable, "-c", timed], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"
+    return proc.stdout.strip().splitlines(), None
+
+def remove_attribute_matrices():
+    for path in glob.glob(os.path.join(REPO_ROOT, ".attributes.yaml.*.npy")):
+        os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="orynt3d-bench-")
+    env = dict(os.environ, ORYNT3D_CACHE_DIR=cache_dir)
+    results = {}
+
+    for label, code in IMPORT_SNIPPETS.items():
+        timings = []
+        for _ in range(args.repeat):
+            out, err = run_snippet(code, env)
+            if err:
+                timings = err
+                break
+            timings.append(float(out[-1]))
+        results[label] = timings
+
+    remove_attribute_matrices()
+    for phase in ("cold", "warm"):
+        out, err = run_snippet(FIRST_LOOKUP_SNIPPET, env)
+        if err:
+            results[f"first semantic lookup ({phase})"] = err
+            break
+        import_time, lookup_time = (float(x) for x in out[-2].split())
+        results[f"import main ({phase})"] = import_time
+        results[f"first semantic lookup ({phase})"] = lookup_time
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
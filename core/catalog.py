@@ -0,0 +1,331 @@
+# core/catalog.py
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from core import generator, logger
+
+CATALOG_NAME = ".orynt3d_catalog.sqlite"
+BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sidecars (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sidecars_folder ON sidecars (folder);
+CREATE TABLE IF NOT EXISTS tags (
+    path TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (path, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+CREATE TABLE IF NOT EXISTS attributes (
+    folder TEXT NOT NULL,
+    source TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attributes_folder ON attributes (folder, source);
+CREATE INDEX IF NOT EXISTS attributes_key_value ON attributes (key, value);
+CREATE TABLE IF NOT EXISTS configs (
+    folder TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    sha1 TEXT
+);
+"""
+
+# attributes.source values
+HARD, SEMANTIC, CONFIG = "hard", "semantic", "config"
+
+# Filesystem types, as listed in /proc/mounts, that live on another machine
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smb", "smb2", "smb3", "smbfs", "afs", "9p", "ceph",
+                       "glusterfs", "fuse.sshfs", "fuse.rclone", "davfs", "fuse.davfs2"}
+DRIVE_REMOTE = 4  # GetDriveTypeW
+
+def is_local_path(path):
+    """
+    True when path is known to be on a local disk. WAL needs shared memory
+    between the processes using the database, which network shares such as
+    SMB don't provide, so it is only enabled where this holds.
+    """
+    path = os.path.abspath(path)
+    if sys.platform == "win32":
+        drive = os.path.splitdrive(path)[0]
+        if not drive or drive.startswith(("\\\\", "//")):
+            return False  # UNC path
+        try:
+            import ctypes
+            return ctypes.windll.kernel32.GetDriveTypeW(drive + "\\") != DRIVE_REMOTE
+        except (ImportError, AttributeError, OSError):
+            return False
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+    path = os.path.realpath(path)
+    best, fstype = "", None
+    for mount_point, mount_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best):
+            best, fstype = mount_point, mount_type
+    return fstype is not None and fstype not in NETWORK_FILESYSTEMS
+
+def catalog_path(root):
+    return os.path.join(root, CATALOG_NAME)
+
+def open_catalog(root, create=False):
+    """The catalog for a library root, or None if it has none and create is False."""
+    path = catalog_path(root)
+    if not create and not os.path.isfile(path):
+        return None
+    try:
+        return Catalog(path)
+    except sqlite3.Error as e:
+        logger.warning("Could not open catalog %s: %s", path, e)
+        return None
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+class Catalog:
+    """
+    SQLite catalog of a library: every sidecar with its size, mtime and raw
+    tags, the hard-mapped, semantic and config attributes of every folder,
+    and the stat and hash of the config.orynt3d last seen or written there.
+
+    Lookups return None when the file on disk no longer matches what was
+    recorded, so callers fall back to the filesystem and record the result.
+    Writes are grouped into transactions of up to BATCH_SIZE changes; use
+    batch() around bulk work and commit() or close() to make it durable.
+    The connection is shared between threads behind a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._batch_depth = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # The catalog sits in the library root, often a network share; keep
+        # the default rollback journal there
+        if is_local_path(os.path.dirname(path) or "."):
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        else:
+            self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    # Transactions
+
+    def _begin(self, changes=1):
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+        self._pending += changes
+
+    def _maybe_commit(self):
+        if self._batch_depth == 0 or self._pending >= BATCH_SIZE:
+            self.commit()
+
+    def commit(self):
+        with self._lock:
+            if self.conn.in_transaction:
+                self.conn.execute("COMMIT")
+            self._pending = 0
+
+    @contextmanager
+    def batch(self):
+        """Group the writes made inside into as few transactions as possible."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.commit()
+
+    def close(self):
+        with self._lock:
+            self.commit()
+            self.conn.close()
+
+    # Sidecars and tags
+
+    def record_sidecar(self, xmp_path, tags):
+        stat = _stat(xmp_path)
+        if stat is None:
+            return
+        with self._lock:
+            self._begin(len(tags) + 1)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sidecars (path, folder, size, mtime_ns, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                (xmp_path, os.path.dirname(xmp_path), stat[0], stat[1], time.time()),
+            )
+            self.conn.execute("DELETE FROM tags WHERE path = ?", (xmp_path,))
+            self.conn.executemany(
+                "INSERT INTO tags (path, position, tag) VALUES (?, ?, ?)",
+                [(xmp_path, i, tag) for i, tag in enumerate(tags)],
+            )
+            self._maybe_commit()
+
+    def _sidecar_row(self, xmp_path):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT size, mtime_ns FROM sidecars WHERE path = ?", (xmp_path,)
+            ).fetchone()
+
+    def sidecar_tags(self, xmp_path):
+        """Recorded tags for xmp_path, or None when it isn't catalogued or has changed since."""
+        row = self._sidecar_row(xmp_path)
+        if row is None or tuple(row) != _stat(xmp_path):
+            return None
+        return self._tags(xmp_path)
+
+    def _tags(self, xmp_path):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT tag FROM tags WHERE path = ? ORDER BY position", (xmp_path,)
+            ).fetchall()
+        return [tag for tag, in rows]
+
+    def sidecars_under(self, root):
+        """{path: (size, mtime_ns, tags)} for every catalogued sidecar below root, without checking the disk."""
+        prefix = os.path.join(root, "")
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT s.path, s.size, s.mtime_ns, t.tag FROM sidecars s LEFT JOIN tags t ON t.path = s.path "
+                "WHERE s.path LIKE ? ESCAPE '\\' ORDER BY s.path, t.position",
+                (escaped + "%",),
+            ).fetchall()
+        result = {}
+        for path, size, mtime_ns, tag in rows:
+            entry = result.get(path)
+            if entry is None:
+                entry = result[path] = (size, mtime_ns, [])
+            if tag is not None:
+                entry[2].append(tag)
+        return result
+
+    def read_tags(self, xmp_path, parse):
+        """Tags for xmp_path from the catalog when fresh, otherwise parse(xmp_path), recorded for next time."""
+        tags = self.sidecar_tags(xmp_path)
+        if tags is None:
+            tags = parse(xmp_path)
+            self.record_sidecar(xmp_path, tags)
+        return tags
+
+    def forget_sidecar(self, xmp_path):
+        with self._lock:
+            self._begin()
+            self.conn.execute("DELETE FROM tags WHERE path = ?", (xmp_path,))
+            self.conn.execute("DELETE FROM sidecars WHERE path = ?", (xmp_path,))
+            self._maybe_commit()
+
+    # Folder attributes and configs
+
+    def record_attributes(self, folder, source, attributes):
+        rows = [(folder, source, k, v) for k, values in attributes.items()
+                for v in (values if isinstance(values, list) else [values])]
+        with self._lock:
+            self._begin(len(rows) + 1)
+            self.conn.execute("DELETE FROM attributes WHERE folder = ? AND source = ?", (folder, source))
+            self.conn.executemany("INSERT INTO attributes (folder, source, key, value) VALUES (?, ?, ?, ?)", rows)
+            self._maybe_commit()
+
+    def attributes(self, folder, source):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT key, value FROM attributes WHERE folder = ? AND source = ? ORDER BY rowid", (folder, source)
+            ).fetchall()
+        result = {}
+        for k, v in rows:
+            result.setdefault(k, []).append(v)
+        return result
+
+    def record_config(self, folder, attributes, text=None):
+        """
+        Record the config.orynt3d in folder as holding attributes: its
+        current stat and the hash of text (the serialized config, rebuilt
+        from attributes when not given).
+        """
+        if text is None:
+            text = generator.serialize_config(generator.build_config(attributes))
+        stat = _stat(os.path.join(folder, generator.CONFIG_NAME))
+        sha1 = hashlib.sha1(text.encode("utf-8")).hexdigest() if stat is not None else None
+        with self._lock:
+            self._begin()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO configs (folder, size, mtime_ns, sha1) VALUES (?, ?, ?, ?)",
+                (folder, *(stat or (None, None)), sha1),
+            )
+            self.record_attributes(folder, CONFIG, attributes if stat is not None else {})
+
+    def config_hash(self, folder):
+        with self._lock:
+            row = self.conn.execute("SELECT sha1 FROM configs WHERE folder = ?", (folder,)).fetchone()
+        return row[0] if row else None
+
+    def existing_attributes(self, folder):
+        """
+        Attributes of folder's config.orynt3d as recorded, {} if it was
+        recorded as missing and still is, or None when unknown or stale.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT size, mtime_ns FROM configs WHERE folder = ?", (folder,)).fetchone()
+        if row is None:
+            return None
+        stat = _stat(os.path.join(folder, generator.CONFIG_NAME))
+        if row[0] is None:
+            return {} if stat is None else None
+        if tuple(row) != stat:
+            return None
+        return self.attributes(folder, CONFIG)
+
+    def read_existing(self, folder, load):
+        """Existing config attributes from the catalog when fresh, otherwise load(folder), recorded."""
+        attributes = self.existing_attributes(folder)
+        if attributes is None:
+            attributes = load(folder)
+            self.record_config(folder, attributes)
+        return attributes
+
+    # Queries
+
+    def files_with_tag(self, tag):
+        with self._lock:
+            rows = self.conn.execute("SELECT DISTINCT path FROM tags WHERE tag = ? ORDER BY path", (tag,)).fetchall()
+        return [path for path, in rows]
+
+    def folders_with_attribute(self, key, value=None, source=CONFIG):
+        query = "SELECT DISTINCT folder FROM attributes WHERE key = ? AND source = ?"
+        params = [key, source]
+        if value is not None:
+            query += " AND value = ?"
+            params.append(value)
+        with self._lock:
+            rows = self.conn.execute(query + " ORDER BY folder", params).fetchall()
+        return [folder for folder, in rows]
+
+    def stats(self):
+        with self._lock:
+            return {
+                table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("sidecars", "tags", "attributes", "configs")
+            }
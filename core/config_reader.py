@@ -0,0 +1,136 @@
+# core/config_reader.py
+import os
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from core import logger
+
+CONFIG_NAME = "config.orynt3d"
+CACHE_SIZE = 4096
+PREFETCH_WORKERS = 8
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def parse_attributes(data):
+    """{key: [values]} from the modelmeta.attributes list of a parsed config."""
+    attr_dict = {}
+    for item in data.get("modelmeta", {}).get("attributes", []):
+        k = item.get("key")
+        v = item.get("value")
+        if k and v:
+            attr_dict.setdefault(k, []).append(v)
+    return attr_dict
+
+def read_config(folder):
+    """
+    Read folder's config.orynt3d from disk. Returns (stat, attributes) with
+    stat taken from the open file, or (None, {}) when there is no config.
+    Unreadable configs give {} with their stat, so they aren't retried
+    until they change.
+    """
+    config_path = os.path.join(folder, CONFIG_NAME)
+    try:
+        f = open(config_path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return None, {}
+    except OSError as e:
+        logger.warning("Failed to load existing config attributes for %s: %s", folder, e)
+        return None, {}
+    with f:
+        st = os.fstat(f.fileno())
+        try:
+            attributes = parse_attributes(json.load(f))
+        except Exception as e:
+            logger.warning("Failed to load existing config attributes for %s: %s", folder, e)
+            attributes = {}
+    return (st.st_size, st.st_mtime_ns), attributes
+
+def attributes_from_bytes(data, folder):
+    """Attributes of a config.orynt3d read into memory elsewhere; {} for None (no config)."""
+    if data is None:
+        return {}
+    try:
+        return parse_attributes(json.loads(data))
+    except Exception as e:
+        logger.warning("Failed to load existing config attributes for %s: %s", folder, e)
+        return {}
+
+class ConfigReader:
+    """
+    LRU cache of the attributes in each folder's config.orynt3d. An entry
+    is used while the file's size and mtime still match, so revisiting a
+    folder costs one stat instead of a read and a JSON parse. Writers call
+    invalidate(folder); generator.generate_config does so for every config
+    it writes. Safe to use from several threads.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # folder -> (stat, attributes)
+        self._lock = threading.Lock()
+
+    def _lookup(self, folder, stat):
+        with self._lock:
+            entry = self._entries.get(folder)
+            if entry is not None and entry[0] == stat:
+                self._entries.move_to_end(folder)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def _store(self, folder, stat, attributes):
+        with self._lock:
+            self._entries[folder] = (stat, attributes)
+            self._entries.move_to_end(folder)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, folder):
+        attributes = self._lookup(folder, _stat(os.path.join(folder, CONFIG_NAME)))
+        if attributes is None:
+            stat, attributes = read_config(folder)
+            self._store(folder, stat, attributes)
+        return attributes
+
+    def get(self, folder):
+        """Existing config attributes of folder as {key: [values]}, {} when it has no config."""
+        # Callers merge into and edit what they get, so hand out copies
+        return {k: list(v) for k, v in self._load(folder).items()}
+
+    def prefetch(self, folders, max_workers=PREFETCH_WORKERS):
+        """Load the configs of many folders concurrently so later get() calls hit the cache."""
+        folders = list(dict.fromkeys(folders))
+        if not folders:
+            return
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(folders))) as pool:
+            for _ in pool.map(self._load, folders):
+                pass
+
+    def invalidate(self, folder=None):
+        """Forget folder's entry, or every entry when folder is None."""
+        with self._lock:
+            if folder is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(folder, None)
+
+reader = ConfigReader()
+
+def load_existing_attributes(folder):
+    return reader.get(folder)
+
+def prefetch(folders, max_workers=PREFETCH_WORKERS):
+    reader.prefetch(folders, max_workers)
+
+def invalidate(folder=None):
+    reader.invalidate(folder)
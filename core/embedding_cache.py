@@ -0,0 +1,159 @@
+# core/embedding_cache.py
+import os
+import re
+import json
+import threading
+
+import numpy as np
+
+from core import logger
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "ORYNT3D_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "orynt3d-config-editor")
+)
+DEFAULT_MAX_ENTRIES = 200000
+MIN_CAPACITY = 1024
+EVICT_FRACTION = 0.1
+
+def normalize_text(text):
+    return " ".join(str(text).lower().split())
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by model name and normalized text.
+    Vectors live in a memory-mapped float32 file (one row per slot) and a
+    small JSON index maps each text to its slot and last-use tick. When the
+    cache is full the least recently used entries are evicted.
+    """
+
+    def __init__(self, model_name, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.vectors_path = os.path.join(cache_dir, f"{slug}.f32")
+        self.index_path = os.path.join(cache_dir, f"{slug}.json")
+        self.entries = {}  # text -> [slot, last_used]
+        self.free_slots = []
+        self.dim = None
+        self.capacity = 0
+        self.tick = 0
+        self.dirty = False
+        self._vectors = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("model") != self.model_name:
+                raise ValueError(f"index belongs to model {data.get('model')!r}")
+            dim = data["dim"]
+            capacity = data["capacity"]
+            expected_size = dim * capacity * 4
+            if os.path.getsize(self.vectors_path) < expected_size:
+                raise ValueError("vector file is shorter than the index expects")
+            self.dim = dim
+            self.capacity = capacity
+            self.tick = data.get("tick", 0)
+            self.entries = {text: list(entry) for text, entry in data["entries"].items()}
+            used = {slot for slot, _ in self.entries.values()}
+            self.free_slots = [slot for slot in range(capacity) if slot not in used]
+            self._open_vectors()
+        except Exception as e:
+            logger.warning("Discarding unreadable embedding cache %s: %s", self.index_path, e)
+            self.entries = {}
+            self.free_slots = []
+            self.dim = None
+            self.capacity = 0
+            self.tick = 0
+
+    def _open_vectors(self):
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+
+    def _grow(self, needed):
+        new_capacity = min(max(self.capacity * 2, self.capacity + needed, MIN_CAPACITY), self.max_entries)
+        if new_capacity <= self.capacity:
+            return
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        os.makedirs(os.path.dirname(self.vectors_path), exist_ok=True)
+        mode = "r+b" if os.path.isfile(self.vectors_path) else "w+b"
+        with open(self.vectors_path, mode) as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self.free_slots.extend(range(self.capacity, new_capacity))
+        self.capacity = new_capacity
+        self._open_vectors()
+
+    def _evict(self, needed):
+        candidates = [(entry[1], text) for text, entry in self.entries.items() if entry[1] != self.tick]
+        count = min(len(candidates), max(needed, int(self.max_entries * EVICT_FRACTION)))
+        candidates.sort()
+        for _, text in candidates[:count]:
+            self.free_slots.append(self.entries.pop(text)[0])
+
+    def _store(self, texts, vectors):
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        needed = len(texts) - len(self.free_slots)
+        if needed > 0:
+            self._grow(needed)
+        needed = len(texts) - len(self.free_slots)
+        if needed > 0:
+            self._evict(needed)
+        for text, vector in zip(texts, vectors):
+            if not self.free_slots:
+                break
+            slot = self.free_slots.pop()
+            self._vectors[slot] = vector
+            self.entries[text] = [slot, self.tick]
+        self.dirty = True
+
+    def encode(self, texts, encode_fn):
+        """
+        Return a float32 array with one embedding per text, in order.
+        encode_fn is called once with the list of normalized texts that are
+        not cached yet and must return an array of shape (n, dim).
+        """
+        keys = [normalize_text(t) for t in texts]
+        with self._lock:
+            self.tick += 1
+            found = {}
+            missing = []
+            for key in dict.fromkeys(keys):
+                entry = self.entries.get(key)
+                if entry is None:
+                    missing.append(key)
+                else:
+                    entry[1] = self.tick
+                    found[key] = np.array(self._vectors[entry[0]])
+            if found:
+                self.dirty = True
+            if missing:
+                vectors = np.asarray(encode_fn(missing), dtype=np.float32)
+                found.update(zip(missing, vectors))
+                self._store(missing, vectors)
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def flush(self):
+        with self._lock:
+            if not self.dirty or self._vectors is None:
+                return
+            self._vectors.flush()
+            data = {
+                "model": self.model_name,
+                "dim": self.dim,
+                "capacity": self.capacity,
+                "tick": self.tick,
+                "entries": self.entries,
+            }
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
@@ -2,8 +2,16 @@
 # core/generator.py
 import json
 import os
+import hashlib
+import stat
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
-def generate_config(folder, attributes):
+from core import config_reader, logger
+from core.config_reader import CONFIG_NAME
+WRITE_WORKERS = 8
+
+def build_config(attributes):
     config = {
         "version": 5,
         "scancfg": {
@@ -40,7 +48,73 @@ def generate_config(folder, attributes):
         }
     }
 
-    output_path = os.path.join(folder, "config.orynt3d")
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=2)
+    return config
+
+def serialize_config(config):
+    """Canonical text form of a config: fixed key order, indent=2, no trailing newline."""
+    return json.dumps(config, indent=2)
+
+def config_sha1(attributes):
+    """SHA-1 of the config generate_config writes for attributes."""
+    return hashlib.sha1(serialize_config(build_config(attributes)).encode("utf-8")).hexdigest()
+
+def write_if_changed(path, text):
+    """
+    Atomically replace path with text (temp file in the same folder, then
+    rename) unless it already holds exactly that text. Returns True if the
+    file was written.
+    """
+    mode = 0o644
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+            mode = stat.S_IMODE(os.fstat(f.fileno()).st_mode)
+    except (OSError, UnicodeDecodeError):
+        pass
+
+    folder = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        # mkstemp creates 0600 files; keep the permissions a plain open() would have left
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+def generate_config(folder, attributes):
+    """Write config.orynt3d for folder. Returns False when the existing file was already identical."""
+    output_path = os.path.join(folder, CONFIG_NAME)
+    written = write_if_changed(output_path, serialize_config(build_config(attributes)))
+    if written:
+        config_reader.invalidate(folder)
+    return written
+
+def generate_configs(items, max_workers=WRITE_WORKERS):
+    """
+    Write configs for an iterable of (folder, attributes) pairs on a thread
+    pool. Folders should be distinct. Returns {"written": n, "skipped": n,
+    "failed": n}.
+    """
+    counts = {"written": 0, "skipped": 0, "failed": 0}
+
+    def write_one(item):
+        folder, attributes = item
+        try:
+            return "written" if generate_config(folder, attributes) else "skipped"
+        except Exception as e:
+            logger.error("Failed to write config for %s: %s", folder, e)
+            return "failed"
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for outcome in pool.map(write_one, items):
+            counts[outcome] += 1
+    return counts
 
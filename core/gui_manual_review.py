@@ -1,17 +1,26 @@
 import sys
 import os
-import json
+import threading
+from collections import deque
+from contextlib import nullcontext
+from functools import partial
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QMainWindow, QVBoxLayout, QHBoxLayout,
     QLabel, QComboBox, QPushButton, QTextEdit, QLineEdit,
     QListWidget, QListWidgetItem, QFileDialog, QMessageBox, QCheckBox,
     QScrollArea, QFrame, QSizePolicy, QSpacerItem
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
 
 # Import your existing modules here
 from core import scanner, indexer, mapper, editor, generator, logger
+from core.catalog import open_catalog
+from core.config_reader import load_existing_attributes
+from core.review_queue import ListReviewQueue, ReviewQueueWriter, UnattendedPolicy, open_review_queue
+
+SCAN_PROGRESS_EVERY = 200
+VOCAB_CHECK_MS = 2000
 
 def load_attribute_yaml():
     # Use your mapper's method or replicate here if needed
@@ -50,6 +59,14 @@ class MultiSelectComboBox(QComboBox):
     def checked_values(self):
         return list(self.checked_items)
 
+    def set_items(self, items):
+        """Replace the choices, keeping what is checked."""
+        self.items = items
+        self.clear()
+        for item in self.items:
+            self.addItem(item)
+        self.set_checked(self.checked_items)
+
     def set_checked(self, values):
         self.checked_items = set(values)
         for i in range(self.count()):
@@ -57,17 +74,117 @@ class MultiSelectComboBox(QComboBox):
             item.setCheckState(Qt.Checked if item.text() in self.checked_items else Qt.Unchecked)
 
 
+class LogSignals(QObject):
+    # Emitted from any thread; Qt delivers it to the panel on the UI thread
+    message = pyqtSignal(str)
+
+class SaveSignals(QObject):
+    # folder, error (None on success)
+    finished = pyqtSignal(str, object)
+
+class SaveTask(QRunnable):
+    """Runs one save_callback call on the thread pool and reports back through signals."""
+
+    def __init__(self, save_callback, folder, attributes):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.save_callback = save_callback
+        self.folder = folder
+        self.attributes = attributes
+        self.signals = SaveSignals()
+
+    def run(self):
+        try:
+            self.save_callback(self.folder, self.attributes)
+            self.signals.finished.emit(self.folder, None)
+        except Exception as e:
+            self.signals.finished.emit(self.folder, e)
+
+
+class BuildQueueSignals(QObject):
+    # folders scanned, folders queued
+    progress = pyqtSignal(int, int)
+    # queue path, cancelled, error (None on success)
+    finished = pyqtSignal(str, bool, object)
+
+class BuildQueueTask(QRunnable):
+    """
+    Walks root on the thread pool and appends every folder that is missing
+    a required attribute after hard mapping and its existing config to the
+    JSON Lines queue at queue_path. The queue file is flushed as it grows,
+    so a cancelled build still leaves a usable queue behind. When root has
+    a catalog, unchanged sidecars and configs are read from it.
+    """
+
+    def __init__(self, root, queue_path):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.root = root
+        self.queue_path = queue_path
+        self.stop = threading.Event()
+        self.signals = BuildQueueSignals()
+
+    def run(self):
+        scanned = 0
+        error = None
+        writer = ReviewQueueWriter(self.queue_path)
+        policy = UnattendedPolicy("defer", queue=writer)
+        catalog = open_catalog(self.root)
+        folders = scanner.iter_folder_sidecars(self.root)
+        try:
+            with catalog.batch() if catalog is not None else nullcontext():
+                for folder, xmp_files in folders:
+                    if self.stop.is_set():
+                        break
+                    if catalog is not None:
+                        _, raw_tags, _ = indexer.get_folder_tags(
+                            xmp_files, partial(catalog.read_tags, parse=indexer.get_tags_from_xmp))
+                        existing_attrs = catalog.read_existing(folder, load_existing_attributes)
+                    else:
+                        _, raw_tags, _ = indexer.get_folder_tags(xmp_files)
+                        existing_attrs = load_existing_attributes(folder)
+                    mapped_tags = mapper.map_tags(raw_tags)
+                    hard_keys = set(mapped_tags)
+                    mapped_tags.update(existing_attrs)
+                    policy.resolve(folder, mapped_tags, hard_keys, existing_attrs)
+                    scanned += 1
+                    if scanned % SCAN_PROGRESS_EVERY == 0:
+                        writer.save()
+                        self.signals.progress.emit(scanned, len(writer))
+        except Exception as e:
+            error = e
+        finally:
+            folders.close()
+            writer.save()
+            if catalog is not None:
+                catalog.close()
+        self.signals.progress.emit(scanned, len(writer))
+        self.signals.finished.emit(self.queue_path, self.stop.is_set(), error)
+
+
 class ManualReviewPanel(QWidget):
     def __init__(self, review_queue, attribute_yaml, save_callback):
         super().__init__()
+        if not hasattr(review_queue, "mark_reviewed"):
+            review_queue = ListReviewQueue(review_queue)
         self.review_queue = review_queue
         self.attribute_yaml = attribute_yaml
         self.save_callback = save_callback
         self.current_index = 0
         self.log_lines = []
 
+        # Saves run on the thread pool; saves to one folder are queued so they land in order
+        self.thread_pool = QThreadPool.globalInstance()
+        self.pending_saves = {}
+        self.active_saves = {}
+        self.failed_saves = 0
+
         self.init_ui()
-        if self.review_queue:
+        # Show messages from the core modules in the log panel too
+        self.log_signals = LogSignals()
+        self.log_signals.message.connect(self.log)
+        logger.set_log_callback(self.log_signals.message.emit)
+        if len(self.review_queue):
             self.load_next_item()
         else:
             self.log("Review queue is empty.")
@@ -105,12 +222,7 @@ class ManualReviewPanel(QWidget):
 
         # Build controls for all attribute keys
         for key, values in sorted(self.attribute_yaml.items()):
-            key_label = QLabel(key.capitalize())
-            key_label.setToolTip(f"Attribute key: {key}")
-            combo = MultiSelectComboBox(values)
-            self.attrs_layout.addWidget(key_label)
-            self.attrs_layout.addWidget(combo)
-            self.attr_controls[key] = combo
+            self.add_attribute_control(key, values)
 
         layout.addSpacerItem(QSpacerItem(20, 20, QSizePolicy.Minimum, QSizePolicy.Expanding))
 
@@ -130,6 +242,9 @@ class ManualReviewPanel(QWidget):
 
         layout.addLayout(nav_layout)
 
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
         # Logs panel
         log_label = QLabel("Logs:")
         layout.addWidget(log_label)
@@ -153,6 +268,7 @@ class ManualReviewPanel(QWidget):
             self.clear_fields()
             return
         folder, attrs = self.review_queue[self.current_index]
+        self.review_queue.mark_reviewed(self.current_index)
         self.folder_label.setText(f"Folder: {folder}")
         self.log(f"Reviewing {folder}")
 
@@ -178,15 +294,46 @@ class ManualReviewPanel(QWidget):
             checked = combo.checked_values()
             if checked:
                 new_attrs[key] = checked
-        self.review_queue[self.current_index] = (folder, new_attrs)
+        self.review_queue.mark_saved(self.current_index, new_attrs)
         self.log(f"Saved attributes for {folder}: {new_attrs}")
 
-        # Call the real save/generate config callback
-        try:
-            self.save_callback(folder, new_attrs)
+        # Call the real save/generate config callback off the UI thread
+        self.pending_saves.setdefault(folder, deque()).append(new_attrs)
+        self.start_next_save(folder)
+        self.update_save_status()
+
+    def start_next_save(self, folder):
+        if folder in self.active_saves or not self.pending_saves.get(folder):
+            return
+        task = SaveTask(self.save_callback, folder, self.pending_saves[folder].popleft())
+        if not self.pending_saves[folder]:
+            del self.pending_saves[folder]
+        task.signals.finished.connect(self.save_finished)
+        self.active_saves[folder] = task  # keeps the task alive until it reports back
+        self.thread_pool.start(task)
+
+    def save_finished(self, folder, error):
+        self.active_saves.pop(folder, None)
+        if error is None:
             self.log(f"Config generated for {folder}")
-        except Exception as e:
-            self.log(f"Error saving config for {folder}: {e}")
+        else:
+            self.failed_saves += 1
+            self.log(f"Error saving config for {folder}: {error}")
+        self.start_next_save(folder)
+        self.update_save_status()
+
+    def pending_save_count(self):
+        return len(self.active_saves) + sum(len(q) for q in self.pending_saves.values())
+
+    def update_save_status(self):
+        parts = []
+        pending = self.pending_save_count()
+        if pending:
+            parts.append(f"Saving {pending}...")
+        if self.failed_saves:
+            parts.append(f"{self.failed_saves} save(s) failed, see log")
+        self.status_label.setText("  ".join(parts))
+        self.status_label.setStyleSheet("color: red" if self.failed_saves else "")
 
     def prev_item(self):
         if self.current_index > 0:
@@ -213,6 +360,46 @@ class ManualReviewPanel(QWidget):
             except Exception as e:
                 self.log(f"Failed to export logs: {e}")
 
+    def add_attribute_control(self, key, values):
+        # Label and combo pairs are kept in key order
+        position = sorted(list(self.attr_controls) + [key]).index(key) * 2
+        key_label = QLabel(key.capitalize())
+        key_label.setToolTip(f"Attribute key: {key}")
+        combo = MultiSelectComboBox(values)
+        self.attrs_layout.insertWidget(position, key_label)
+        self.attrs_layout.insertWidget(position + 1, combo)
+        self.attr_controls[key] = combo
+
+    def remove_attribute_control(self, key):
+        combo = self.attr_controls.pop(key)
+        idx = self.attrs_layout.indexOf(combo)
+        label_widget = self.attrs_layout.itemAt(idx - 1).widget() if idx > 0 else None
+        for widget in (label_widget, combo):
+            if widget is not None:
+                self.attrs_layout.removeWidget(widget)
+                widget.deleteLater()
+
+    def update_vocabulary(self, attribute_yaml):
+        """Apply an edited attributes.yaml: add, drop and refill controls, keeping checked values."""
+        self.attribute_yaml = attribute_yaml
+        for key in [k for k in self.attr_controls if k not in attribute_yaml]:
+            self.remove_attribute_control(key)
+        added = []
+        for key, values in sorted(attribute_yaml.items()):
+            combo = self.attr_controls.get(key)
+            if combo is None:
+                self.add_attribute_control(key, values)
+                added.append(key)
+            elif combo.items != values:
+                combo.set_items(values)
+        self.apply_filter(self.filter_input.text())
+        # New keys show the current item's values, like the rest did when it was loaded
+        if added and self.current_index < len(self.review_queue):
+            _, attrs = self.review_queue[self.current_index]
+            for key in added:
+                self.attr_controls[key].set_checked(attrs.get(key, []))
+        self.log("Attribute vocabulary reloaded.")
+
     def apply_filter(self, text):
         text = text.strip().lower()
         for key, combo in self.attr_controls.items():
@@ -232,9 +419,27 @@ class MainWindow(QMainWindow):
         self.resize(850, 750)
         self.review_panel = ManualReviewPanel(review_queue, attribute_yaml, self.save_config)
         self.setCentralWidget(self.review_panel)
+        self.build_task = None
+        self.running_builds = set()
+
+        self.build_status = QLabel("")
+        self.cancel_build_btn = QPushButton("Cancel Build")
+        self.cancel_build_btn.clicked.connect(self.cancel_build)
+        self.cancel_build_btn.hide()
+        self.statusBar().addWidget(self.build_status, 1)
+        self.statusBar().addPermanentWidget(self.cancel_build_btn)
+
+        # Pick up edits to attributes.yaml without a restart
+        self.vocab_timer = QTimer(self)
+        self.vocab_timer.timeout.connect(self.check_vocabulary)
+        self.vocab_timer.start(VOCAB_CHECK_MS)
 
         self.create_menu()
 
+    def check_vocabulary(self):
+        if mapper.reload_if_changed(0):
+            self.review_panel.update_vocabulary(load_attribute_yaml())
+
     def create_menu(self):
         menubar = self.menuBar()
         file_menu = menubar.addMenu("&File")
@@ -242,6 +447,9 @@ class MainWindow(QMainWindow):
         load_queue_action = file_menu.addAction("Load Review Queue...")
         load_queue_action.triggered.connect(self.load_review_queue)
 
+        build_queue_action = file_menu.addAction("Build Queue from Folder...")
+        build_queue_action.triggered.connect(self.build_review_queue)
+
         export_logs_action = file_menu.addAction("Export Logs...")
         export_logs_action.triggered.connect(self.review_panel.export_logs)
 
@@ -251,24 +459,86 @@ class MainWindow(QMainWindow):
     def save_config(self, folder, attributes):
         # Use your generator module's function here
         generator.generate_config(folder, attributes)
-        logger.log(f"Generated config for {folder}")
+        logger.debug("Generated config for %s", folder)
 
     def load_review_queue(self):
         options = QFileDialog.Options()
-        filename, _ = QFileDialog.getOpenFileName(self, "Open Review Queue File", "", "JSON Files (*.json);;All Files (*)", options=options)
+        filename, _ = QFileDialog.getOpenFileName(self, "Open Review Queue File", "", "Review Queues (*.jsonl *.json);;All Files (*)", options=options)
         if filename:
-            try:
-                with open(filename, "r", encoding="utf-8") as f:
-                    queue = json.load(f)
-                # Validate queue format: list of [folder, attributes] pairs
-                if not isinstance(queue, list) or not all(isinstance(i, list) and len(i) == 2 for i in queue):
-                    raise ValueError("Invalid review queue format.")
-                self.review_panel.review_queue = queue
-                self.review_panel.current_index = 0
-                self.review_panel.load_next_item()
-                self.review_panel.log(f"Loaded review queue from {filename}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error Loading Queue", f"Failed to load queue:\n{e}")
+            self.open_queue_file(filename)
+
+    def open_queue_file(self, filename):
+        try:
+            # Legacy JSON list queues are converted to JSON Lines once, then paged lazily
+            queue = open_review_queue(filename)
+            self.review_panel.review_queue.close()
+            self.review_panel.review_queue = queue
+            self.review_panel.current_index = queue.first_unreviewed()
+            self.review_panel.load_next_item()
+            self.review_panel.log(
+                f"Loaded review queue from {filename}: {len(queue)} items, resuming at {self.review_panel.current_index + 1}"
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error Loading Queue", f"Failed to load queue:\n{e}")
+
+    def build_review_queue(self):
+        root = QFileDialog.getExistingDirectory(self, "Choose Model Root Folder")
+        if not root:
+            return
+        queue_path, _ = QFileDialog.getSaveFileName(
+            self, "Save Review Queue As", os.path.join(root, "review_queue.jsonl"), "Review Queues (*.jsonl)"
+        )
+        if not queue_path:
+            return
+        # Only one build at a time; choosing a new root abandons the previous one
+        if self.build_task is not None:
+            self.build_task.stop.set()
+        task = BuildQueueTask(root, queue_path)
+        task.signals.progress.connect(lambda scanned, queued: self.build_progress(task, scanned, queued))
+        task.signals.finished.connect(lambda path, cancelled, error: self.build_finished(task, path, cancelled, error))
+        self.build_task = task
+        self.running_builds.add(task)  # keeps the task alive until it reports back
+        self.build_status.setText(f"Scanning {root}...")
+        self.cancel_build_btn.show()
+        self.review_panel.log(f"Building review queue from {root} into {queue_path}")
+        QThreadPool.globalInstance().start(task)
+
+    def build_progress(self, task, scanned, queued):
+        if task is self.build_task:
+            self.build_status.setText(f"Scanning... {scanned} folders, {queued} queued")
+
+    def build_finished(self, task, queue_path, cancelled, error):
+        self.running_builds.discard(task)
+        if task is not self.build_task:
+            return  # superseded by a newer build
+        self.build_task = None
+        self.cancel_build_btn.hide()
+        if error is not None:
+            self.build_status.setText("Queue build failed")
+            self.review_panel.log(f"Error building review queue: {error}")
+            return
+        self.build_status.setText("Queue build cancelled" if cancelled else "Queue build finished")
+        if os.path.isfile(queue_path):
+            self.open_queue_file(queue_path)
+        else:
+            self.review_panel.log("No folders needed review.")
+
+    def cancel_build(self):
+        # The task stops at the next folder and still reports back, so the partial queue is opened
+        if self.build_task is not None:
+            self.build_task.stop.set()
+            self.build_status.setText("Cancelling queue build...")
+
+    def closeEvent(self, event):
+        # Let queued saves finish before the window goes away
+        panel = self.review_panel
+        for task in self.running_builds:
+            task.stop.set()
+        while panel.pending_save_count():
+            panel.thread_pool.waitForDone()
+            QApplication.processEvents()
+        panel.review_queue.close()
+        super().closeEvent(event)
 
 def run_gui(review_queue=None):
     if review_queue is None:
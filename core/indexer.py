@@ -1,5 +1,114 @@
+import io
 import xml.etree.ElementTree as ET
-import logging
+from xml.parsers import expat
+
+from core import logger
+
+RDF_NS = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+DC_NS = 'http://purl.org/dc/elements/1.1/'
+NAMESPACES = {'rdf': RDF_NS, 'dc': DC_NS}
+
+# Element names as expat reports them with namespace_separator=" "
+DESCRIPTION_TAG = f'{RDF_NS} Description'
+SUBJECT_TAG = f'{DC_NS} subject'
+BAG_TAG = f'{RDF_NS} Bag'
+LI_TAG = f'{RDF_NS} li'
+
+READ_CHUNK_SIZE = 16 * 1024
+
+def _tree_subject_tags(data):
+    """dc:subject/rdf:Bag/rdf:li texts of an XMP packet held in memory, from its element tree."""
+    tags = []
+    for description in ET.fromstring(data).findall('.//rdf:Description', NAMESPACES):
+        subject = description.find('dc:subject', NAMESPACES)
+        if subject is not None:
+            bag = subject.find('rdf:Bag', NAMESPACES)
+            if bag is not None:
+                for li in bag.findall('rdf:li', NAMESPACES):
+                    if li.text:
+                        tags.append(li.text.lower())
+    return tags
+
+# Kinds of open element _stream_subject_tags tracks; each one's child of interest is the next kind
+DESCRIPTION, SUBJECT, BAG = 0, 1, 2
+
+def _stream_subject_tags(stream):
+    """
+    Collect dc:subject/rdf:Bag/rdf:li texts from an XMP packet read from a
+    binary stream. A packet that fits in one read is parsed into a tree,
+    which is quickest; a larger one, which is a packet with an embedded
+    thumbnail or history, goes through expat chunk by chunk without
+    building one. Character data is then only handed to Python inside an
+    rdf:li, so the thumbnail is never materialized.
+
+    Either way the result is what _tree_subject_tags gives for the whole
+    packet: every rdf:Description below the root, in document order and
+    across all rdf:RDF blocks; the first dc:subject child of each and the
+    first rdf:Bag child of that; the text before the first child element of
+    each of its rdf:li children, lowercased, when not empty. The whole
+    document is parsed, so it raises ET.ParseError or expat.ExpatError
+    wherever it is malformed.
+    """
+    chunk = stream.read(READ_CHUNK_SIZE)
+    if len(chunk) < READ_CHUNK_SIZE:
+        return _tree_subject_tags(chunk)
+
+    parser = expat.ParserCreate(namespace_separator=" ")
+    parser.buffer_text = True
+    groups = []  # tags of each description, in the order the descriptions start
+    frames = []  # [depth, kind, tags, child seen] for open descriptions, subjects and bags
+    depth = 0
+    text = None  # parts of the rdf:li text being read
+    li_tags = None
+
+    def finish_li():
+        nonlocal text
+        parser.CharacterDataHandler = None
+        value = "".join(text)
+        text = None
+        if value:
+            li_tags.append(value.lower())
+
+    def start(tag, attrib):
+        nonlocal depth, text, li_tags
+        if text is not None:
+            finish_li()
+        depth += 1
+        if tag == DESCRIPTION_TAG:
+            if depth > 1:
+                tags = []
+                groups.append(tags)
+                frames.append([depth, DESCRIPTION, tags, False])
+            return
+        # Only direct children of the innermost tracked element matter
+        if not frames or frames[-1][0] != depth - 1:
+            return
+        frame = frames[-1]
+        kind = frame[1]
+        if kind == BAG:
+            if tag == LI_TAG:
+                text = []
+                li_tags = frame[2]
+                parser.CharacterDataHandler = text.append
+        elif not frame[3] and tag == (SUBJECT_TAG if kind == DESCRIPTION else BAG_TAG):
+            frame[3] = True
+            frames.append([depth, kind + 1, frame[2], False])
+
+    def end(tag):
+        nonlocal depth
+        if text is not None:
+            finish_li()
+        if frames and frames[-1][0] == depth:
+            frames.pop()
+        depth -= 1
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    while chunk:
+        parser.Parse(chunk, False)
+        chunk = stream.read(READ_CHUNK_SIZE)
+    parser.Parse(b'', True)
+    return [tag for tags in groups for tag in tags]
 
 def get_tags_from_xmp(xmp_path):
     """
@@ -7,27 +116,40 @@ def get_tags_from_xmp(xmp_path):
     Returns list of lowercase tags.
     """
     try:
-        tree = ET.parse(xmp_path)
-        root = tree.getroot()
-        ns = {
-            'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
-            'dc': 'http://purl.org/dc/elements/1.1/'
-        }
-
-        tags = []
-        for description in root.findall('.//rdf:Description', ns):
-            subject = description.find('dc:subject', ns)
-            if subject is not None:
-                bag = subject.find('rdf:Bag', ns)
-                if bag is not None:
-                    for li in bag.findall('rdf:li', ns):
-                        if li.text:
-                            tags.append(li.text.lower())
-        return tags
-
-    except ET.ParseError as e:
-        logging.error(f"Failed to parse XML {xmp_path}: {e}")
+        with open(xmp_path, 'rb') as f:
+            return _stream_subject_tags(f)
+
+    except (ET.ParseError, expat.ExpatError) as e:
+        logger.error("Failed to parse XML %s: %s", xmp_path, e)
+        return []
+    except Exception as e:
+        logger.error("Unexpected error reading %s: %s", xmp_path, e)
+        return []
+
+def get_tags_from_bytes(data, xmp_path="<bytes>"):
+    """get_tags_from_xmp for sidecar contents already in memory, e.g. read ahead from a share."""
+    try:
+        return _stream_subject_tags(io.BytesIO(data))
+    except (ET.ParseError, expat.ExpatError) as e:
+        logger.error("Failed to parse XML %s: %s", xmp_path, e)
         return []
     except Exception as e:
-        logging.error(f"Unexpected error reading {xmp_path}: {e}")
+        logger.error("Unexpected error reading %s: %s", xmp_path, e)
         return []
+
+def union_tags(tag_lists):
+    """
+    Merge the tag lists of a folder's sidecars. Returns (tags, counts):
+    every distinct tag once, ordered by the number of sidecars carrying it
+    and then by first appearance, and that number for each tag.
+    """
+    counts = {}
+    for tags in tag_lists:
+        for tag in dict.fromkeys(tags):
+            counts[tag] = counts.get(tag, 0) + 1
+    return sorted(counts, key=lambda tag: -counts[tag]), counts
+
+def get_folder_tags(xmp_paths, read_tags=get_tags_from_xmp):
+    """Read every sidecar in xmp_paths; returns (tag_lists, tags, counts) with tags and counts from union_tags."""
+    tag_lists = [read_tags(xmp_path) for xmp_path in xmp_paths]
+    return (tag_lists,) + union_tags(tag_lists)
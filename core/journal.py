@@ -0,0 +1,126 @@
+# core/journal.py
+import os
+import json
+import time
+
+from core import logger
+
+JOURNAL_NAME = ".orynt3d_journal.jsonl"
+JOURNAL_VERSION = 1
+FSYNC_EVERY = 64
+FSYNC_SECONDS = 2.0
+
+# Folder outcomes
+WRITTEN, UNCHANGED, DEFERRED = "written", "unchanged", "deferred"
+
+def journal_path(root):
+    return os.path.join(root, JOURNAL_NAME)
+
+class RunJournal:
+    """
+    Append-only JSON Lines record of one run over a library: a header line
+    with the root, one line per folder as it completes (outcome and the
+    SHA-1 of the config written for it), and a final line when the run
+    finishes.
+
+    Lines are buffered and written and fsynced together every FSYNC_EVERY
+    folders or FSYNC_SECONDS, whichever comes first, and on close(). A
+    crash loses at most that last batch, whose folders are simply done
+    again. A truncated or garbled last line, from a crash mid-write, is
+    dropped when the journal is reopened.
+    """
+
+    def __init__(self, path, root, resume=False, fsync_every=FSYNC_EVERY, fsync_seconds=FSYNC_SECONDS):
+        self.path = path
+        self.root = root
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self.completed = {}  # folder -> record
+        self.finished = False
+        self._buffer = []
+        self._last_sync = time.monotonic()
+        valid_length = self._load() if resume else None
+        if valid_length is not None and not self.finished:
+            self.file = open(path, "r+b")
+            self.file.truncate(valid_length)
+            self.file.seek(valid_length)
+            logger.info("Resuming run: %d folders already done (%s)", len(self.completed), path)
+        else:
+            if resume:
+                logger.info("Nothing to resume in %s; starting a new run", path)
+            self.completed = {}
+            self.finished = False
+            self.file = open(path, "wb")
+            self._append({"journal": JOURNAL_VERSION, "root": root, "started": time.time()})
+            self.sync()
+
+    def _load(self):
+        """
+        Read an existing journal. Returns the length of its valid prefix to
+        continue appending after, or None when there is none to resume.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Could not read run journal %s: %s", self.path, e)
+            return None
+        offset = 0
+        header = None
+        for line in data.splitlines(keepends=True):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("truncated")
+                record = json.loads(line)
+            except ValueError:
+                if offset + len(line) < len(data):
+                    logger.warning("Skipping a corrupt line in run journal %s", self.path)
+                    offset += len(line)
+                    continue
+                logger.warning("Dropping a truncated last record from run journal %s", self.path)
+                break
+            offset += len(line)
+            if header is None:
+                header = record
+                if record.get("journal") != JOURNAL_VERSION or record.get("root") != self.root:
+                    logger.warning("Run journal %s belongs to another run (%s)", self.path, record.get("root"))
+                    return None
+            elif "folder" in record:
+                self.completed[record["folder"]] = record
+            elif record.get("finished"):
+                self.finished = True
+        return offset if header is not None else None
+
+    def _append(self, record):
+        self._buffer.append(json.dumps(record).encode("utf-8") + b"\n")
+
+    def is_done(self, folder):
+        return folder in self.completed
+
+    def record(self, folder, outcome, config_sha1=None):
+        record = {"folder": folder, "outcome": outcome, "sha1": config_sha1, "time": time.time()}
+        self.completed[folder] = record
+        self._append(record)
+        if len(self._buffer) >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_seconds:
+            self.sync()
+
+    def sync(self):
+        if self._buffer:
+            self.file.write(b"".join(self._buffer))
+            self._buffer.clear()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._last_sync = time.monotonic()
+
+    def finish(self):
+        """Mark the run as complete, so a later --resume starts over."""
+        self._append({"finished": time.time(), "folders": len(self.completed)})
+        self.finished = True
+
+    def close(self):
+        try:
+            self.sync()
+        finally:
+            self.file.close()
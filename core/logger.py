@@ -1,2 +1,215 @@
-def log(message):
-    print(f"[LOG] {message}")
\ No newline at end of file
+# core/logger.py
+import sys
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from logging.handlers import MemoryHandler
+
+LOGGER_NAME = "orynt3d"
+FORMAT = "[%(levelname)s] %(message)s"
+FILE_FORMAT = "%(asctime)s %(threadName)s [%(levelname)s] %(message)s"
+BUFFER_CAPACITY = 512
+# Stages in the order a run goes through them; others are listed after these
+STAGES = ("scan", "parse", "map", "semantic", "write")
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+_logger = logging.getLogger(LOGGER_NAME)
+_logger.propagate = False
+_sinks = []
+_callbacks = {}
+_lock = threading.Lock()
+
+# Logging
+#
+# Messages take %-style arguments, which are only formatted when a sink
+# will actually emit the record: logger.debug("Raw tags: %s", raw_tags)
+# costs almost nothing at INFO level.
+
+def log(message, *args, level=INFO):
+    _logger.log(level, message, *args)
+
+def debug(message, *args):
+    _logger.debug(message, *args)
+
+def info(message, *args):
+    _logger.info(message, *args)
+
+def warning(message, *args):
+    _logger.warning(message, *args)
+
+def error(message, *args, exc_info=False):
+    _logger.error(message, *args, exc_info=exc_info)
+
+def is_enabled_for(level):
+    return _logger.isEnabledFor(level)
+
+class CallbackHandler(logging.Handler):
+    """Sink that passes each formatted message to callback(message), e.g. a GUI log panel."""
+
+    def __init__(self, callback, level=logging.NOTSET):
+        super().__init__(level)
+        self.callback = callback
+        self.setFormatter(logging.Formatter("%(message)s"))
+
+    def emit(self, record):
+        try:
+            self.callback(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+def _add_sink(handler, buffered):
+    if buffered:
+        # Records are held until the buffer fills, a warning arrives or flush() is called
+        handler = MemoryHandler(BUFFER_CAPACITY, flushLevel=WARNING, target=handler, flushOnClose=True)
+    _logger.addHandler(handler)
+    _sinks.append(handler)
+
+def configure(level=INFO, console=True, log_file=None, buffered=False):
+    """
+    Replace the console and file sinks. Callback sinks added with
+    add_callback() are kept. With buffered=True, console and file output
+    is written in blocks instead of one write per record; call flush()
+    before anything that must appear in order with them, like a prompt.
+    """
+    with _lock:
+        for handler in _sinks:
+            _logger.removeHandler(handler)
+            handler.close()
+        _sinks.clear()
+        _logger.setLevel(level)
+        if console:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter(FORMAT))
+            _add_sink(handler, buffered)
+        if log_file:
+            handler = logging.FileHandler(log_file, encoding="utf-8")
+            handler.setFormatter(logging.Formatter(FILE_FORMAT))
+            _add_sink(handler, buffered)
+
+def flush():
+    for handler in list(_sinks):
+        handler.flush()
+
+def add_callback(callback, level=logging.NOTSET):
+    """
+    Send every message to callback(message). The callback runs on whichever
+    thread logged, so GUI callbacks must hand the message to their UI thread.
+    """
+    with _lock:
+        remove_callback(callback)
+        handler = CallbackHandler(callback, level)
+        _callbacks[callback] = handler
+        _logger.addHandler(handler)
+
+def remove_callback(callback):
+    handler = _callbacks.pop(callback, None)
+    if handler is not None:
+        _logger.removeHandler(handler)
+
+_log_callback = None
+
+def set_log_callback(callback):
+    """Route messages to callback, replacing the one set by a previous call (None to stop)."""
+    global _log_callback
+    if _log_callback is not None:
+        remove_callback(_log_callback)
+    _log_callback = callback
+    if callback is not None:
+        add_callback(callback)
+
+# Timing spans and counters
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+
+    def add(self, items, seconds):
+        self.items += items
+        self.busy += seconds
+
+    def throughput(self):
+        return self.items / self.busy if self.busy else 0.0
+
+    def __str__(self):
+        return f"{self.name}: {self.items} items in {self.busy:.2f}s busy ({self.throughput():.1f}/s)"
+
+class Metrics:
+    """Thread-safe per-stage time and item totals plus named counters for one run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.started = time.perf_counter()
+
+    def add(self, stage, items, seconds):
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats(stage)
+            stats.add(items, seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def span(self, stage, items=1):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, items, time.perf_counter() - start)
+
+    def timed_iter(self, stage, iterable):
+        """Yield from iterable, charging the time spent producing each item to stage."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, 0, time.perf_counter() - start)
+                return
+            self.add(stage, 1, time.perf_counter() - start)
+            yield item
+
+    def summary(self):
+        with self._lock:
+            order = [s for s in STAGES if s in self.stages] + sorted(s for s in self.stages if s not in STAGES)
+            lines = [str(self.stages[s]) for s in order]
+            lines += [f"{name}: {value}" for name, value in sorted(self.counters.items())]
+            elapsed = time.perf_counter() - self.started
+        lines.append(f"elapsed: {elapsed:.2f}s")
+        return lines
+
+metrics = Metrics()
+
+def span(stage, items=1):
+    """Context manager that adds the time spent inside it, and items, to stage."""
+    return metrics.span(stage, items)
+
+def count(name, n=1):
+    metrics.count(name, n)
+
+def timed_iter(stage, iterable):
+    return metrics.timed_iter(stage, iterable)
+
+def log_summary(title="Run summary"):
+    info("%s:", title)
+    for line in metrics.summary():
+        info("  %s", line)
+    flush()
+
+configure()
@@ -0,0 +1,175 @@
+# core/manifest.py
+import os
+import json
+import hashlib
+import threading
+
+from core import logger
+
+CONFIG_NAME = "config.orynt3d"
+SAVE_EVERY = 1000
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def file_state(path, previous=None):
+    """
+    Return {"size", "mtime_ns", "sha1"} for path, or None if it doesn't exist.
+    The content hash is reused from previous when size and mtime still match.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if previous and previous["size"] == st.st_size and previous["mtime_ns"] == st.st_mtime_ns:
+        return previous
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": file_digest(path)}
+
+def _same_stat(state, previous):
+    if state is None or previous is None:
+        return state is previous
+    return state["size"] == previous["size"] and state["mtime_ns"] == previous["mtime_ns"]
+
+def _same_content(state, previous):
+    if state is None or previous is None:
+        return state is previous
+    return state["sha1"] == previous["sha1"]
+
+class Manifest:
+    """
+    Persistent record of every processed sidecar and the config.orynt3d next
+    to it (path, size, mtime and content hash), used to skip folders that
+    haven't changed since the last run.
+
+    Safe to share between threads: the pipeline checks folders on its scan
+    thread while the main thread records the ones it has written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.unsaved = 0
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            logger.warning("Ignoring unreadable manifest %s: %s", self.path, e)
+            self.entries = {}
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(dict(self.entries), f)
+            os.replace(tmp_path, self.path)
+            self.unsaved = 0
+
+    def status(self, xmp_path):
+        """Return "new", "modified" or None when the sidecar and its config are unchanged."""
+        entry = self.entries.get(xmp_path)
+        if entry is None:
+            return "new"
+        config_path = os.path.join(os.path.dirname(xmp_path), CONFIG_NAME)
+        try:
+            st = os.stat(xmp_path)
+        except OSError:
+            return "modified"
+        sidecar = entry["sidecar"]
+        config_stat = None
+        if os.path.isfile(config_path):
+            cst = os.stat(config_path)
+            config_stat = {"size": cst.st_size, "mtime_ns": cst.st_mtime_ns}
+        if (sidecar["size"] == st.st_size and sidecar["mtime_ns"] == st.st_mtime_ns
+                and _same_stat(config_stat, entry["config"])):
+            return None
+
+        # Timestamps moved; only report a change if the content did too.
+        new_sidecar = file_state(xmp_path, sidecar)
+        new_config = file_state(config_path, entry["config"])
+        if _same_content(new_sidecar, sidecar) and _same_content(new_config, entry["config"]):
+            with self._lock:
+                self.entries[xmp_path] = {"sidecar": new_sidecar, "config": new_config}
+                self._mark_dirty()
+            return None
+        return "modified"
+
+    def changes(self, xmp_paths):
+        """
+        Yield (status, path) for every new or modified sidecar in xmp_paths,
+        followed by ("deleted", path) for recorded sidecars that weren't seen.
+        """
+        seen = set()
+        for xmp_path in xmp_paths:
+            seen.add(xmp_path)
+            status = self.status(xmp_path)
+            if status:
+                yield status, xmp_path
+        for xmp_path in self._unseen(seen):
+            yield "deleted", xmp_path
+
+    def folder_changes(self, folders):
+        """
+        Folder-level changes(): folders yields (folder, xmp_paths). Yields
+        (folder, xmp_paths, changes), changes being the (status, path) pairs
+        of its new or modified sidecars, for every folder that has any.
+        Once all folders are seen, recorded sidecars that weren't are
+        yielded as ("deleted", path) changes, grouped by folder; xmp_paths
+        is then the folder's remaining sidecars if nothing else in it
+        changed, and empty if it has none left or was already yielded.
+        """
+        seen = set()
+        unchanged = {}
+        for folder, xmp_paths in folders:
+            seen.update(xmp_paths)
+            changes = []
+            for xmp_path in xmp_paths:
+                status = self.status(xmp_path)
+                if status:
+                    changes.append((status, xmp_path))
+            if changes:
+                yield folder, xmp_paths, changes
+            else:
+                unchanged[folder] = xmp_paths
+        deleted = {}
+        for xmp_path in self._unseen(seen):
+            deleted.setdefault(os.path.dirname(xmp_path), []).append(("deleted", xmp_path))
+        for folder, changes in deleted.items():
+            yield folder, unchanged.get(folder, []), changes
+
+    def _unseen(self, seen):
+        with self._lock:
+            return [p for p in self.entries if p not in seen]
+
+    def record(self, xmp_path):
+        entry = self.entries.get(xmp_path, {})
+        sidecar = file_state(xmp_path, entry.get("sidecar"))
+        if sidecar is None:
+            self.purge([xmp_path])
+            return
+        config_path = os.path.join(os.path.dirname(xmp_path), CONFIG_NAME)
+        config = file_state(config_path, entry.get("config"))
+        with self._lock:
+            self.entries[xmp_path] = {"sidecar": sidecar, "config": config}
+            self._mark_dirty()
+
+    def purge(self, xmp_paths):
+        with self._lock:
+            for xmp_path in xmp_paths:
+                if self.entries.pop(xmp_path, None) is not None:
+                    self._mark_dirty()
+
+    def _mark_dirty(self):
+        with self._lock:
+            self.unsaved += 1
+            if self.unsaved >= SAVE_EVERY:
+                self.save()
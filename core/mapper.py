@@ -2,12 +2,99 @@
 
 import yaml
 import os
+import time
+import hashlib
+from collections import deque
+
+from core import logger
+
+PHRASE_CACHE_SIZE = 100000
+# Top-level YAML sections that configure mapping rather than list attribute values
+SPECIAL_SECTIONS = ("phrase_map", "semantic_thresholds")
+RELOAD_CHECK_SECONDS = 1.0
+
+def default_yaml_path():
+    """
+    attributes.yaml to use when none is given: $ORYNT3D_ATTRIBUTES, else the
+    one in the working directory, else the one shipped next to core/.
+    """
+    path = os.environ.get("ORYNT3D_ATTRIBUTES")
+    if path:
+        return path
+    if os.path.isfile("attributes.yaml"):
+        return os.path.abspath("attributes.yaml")
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "attributes.yaml")
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a list of phrases. find(text) returns the
+    indices of every phrase that occurs in text as a substring, in one pass
+    over the text regardless of how many phrases there are.
+    """
+
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        self.always = []
+        for idx, phrase in enumerate(phrases):
+            if not phrase:
+                self.always.append(idx)
+                continue
+            state = 0
+            for ch in phrase:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(idx)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text):
+        found = set(self.always)
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
 
 class TagMapper:
-    def __init__(self, yaml_path="attributes.yaml"):
-        self.yaml_path = yaml_path
+    """
+    Hard mapping of tags to attributes from attributes.yaml. reload_if_changed()
+    notices edits to the file (by mtime and size, confirmed by content hash)
+    and rebuilds the lookup structures in place; version goes up on every
+    reload that changed the vocabulary.
+    """
+
+    def __init__(self, yaml_path=None):
+        self.yaml_path = yaml_path or default_yaml_path()
         self.attributes_map = {}
         self.phrase_map = {}
+        self.semantic_thresholds = {}
+        self.version = 0
+        self.yaml_stat = None
+        self.yaml_sha1 = None
+        self._rejected_stat = None
+        self._last_check = 0.0
+        self.compile()
         self.required_keys = [
             "age", "armor", "class", "clothing", "element", "faction", "gender",
             "held", "holding", "mount", "pose", "race", "racegroup", "role",
@@ -15,42 +102,148 @@ class TagMapper:
         ]
         self.load_yaml()
 
+    def _stat_yaml(self):
+        try:
+            st = os.stat(self.yaml_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
     def load_yaml(self):
-        if not os.path.isfile(self.yaml_path):
-            print(f"[mapper] YAML file not found: {self.yaml_path}")
-            return
+        """
+        (Re)load the YAML file. Returns True when the vocabulary changed.
+        Everything is parsed, checked and compiled before any of it is
+        applied, so a file that fails anywhere leaves the previous
+        vocabulary in place; it isn't tried again until it changes.
+        """
+        stat = self._stat_yaml()
+        if stat is None:
+            logger.warning("Attribute YAML file not found: %s", self.yaml_path)
+            return False
+
+        try:
+            with open(self.yaml_path, "rb") as f:
+                raw = f.read()
+            sha1 = hashlib.sha1(raw).hexdigest()
+            if sha1 == self.yaml_sha1:
+                self.yaml_stat = stat
+                return False
+            data = yaml.safe_load(raw.decode("utf-8"))
+            if not isinstance(data, dict):
+                raise ValueError("expected a mapping of attribute keys")
+            attributes_map = {k: v for k, v in data.items() if k not in SPECIAL_SECTIONS}
+            phrase_map = data.get("phrase_map") or {}
+            thresholds = data.get("semantic_thresholds") or {}
+            if not isinstance(phrase_map, dict) or not isinstance(thresholds, dict):
+                raise ValueError("phrase_map and semantic_thresholds must be mappings")
+            # Optional per-key semantic score cutoffs, e.g. {default: 0.55, gender: 0.7}
+            semantic_thresholds = {k: float(v) for k, v in thresholds.items()}
+            compiled = self._build(attributes_map, phrase_map)
+        except Exception as e:
+            self._rejected_stat = stat
+            logger.warning("Attribute YAML file %s is invalid, keeping the previous vocabulary: %s",
+                           self.yaml_path, e)
+            return False
 
-        with open(self.yaml_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+        self.attributes_map = attributes_map
+        self.phrase_map = phrase_map
+        self.semantic_thresholds = semantic_thresholds
+        self._install(compiled)
+        self.yaml_stat = stat
+        self.yaml_sha1 = sha1
+        self.version += 1
+        return True
 
-        if not isinstance(data, dict):
-            print("[mapper] YAML file format invalid")
-            return
+    def reload_if_changed(self, min_interval=RELOAD_CHECK_SECONDS):
+        """
+        Reload attributes.yaml if it changed on disk. The file is stat'ed at
+        most once per min_interval seconds, so this is cheap to call often.
+        Returns True when the vocabulary was rebuilt.
+        """
+        now = time.monotonic()
+        if now - self._last_check < min_interval:
+            return False
+        self._last_check = now
+        stat = self._stat_yaml()
+        if stat is None or stat == self.yaml_stat or stat == self._rejected_stat:
+            return False
+        if not self.load_yaml():
+            return False
+        logger.info("Reloaded %s: %d keys, %d phrases", self.yaml_path,
+                    len(self.attributes_map), len(self.phrase_map or {}))
+        return True
 
-        self.attributes_map = {k: v for k, v in data.items() if k != "phrase_map"}
-        self.phrase_map = data.get("phrase_map", {})
+    def compile(self):
+        """
+        Build the lookup structures map_tags uses: a lowercase value -> [(order,
+        key, value)] index and one Aho-Corasick matcher over all phrases.
+        They are built aside and swapped in with one assignment, so threads
+        mapping tags during a reload see either the old or the new set.
+        """
+        self._install(self._build(self.attributes_map, self.phrase_map))
+
+    @staticmethod
+    def _build(attributes_map, phrase_map):
+        value_index = {}
+        order = 0
+        for key, values in attributes_map.items():
+            for val in values or []:
+                if isinstance(val, str):
+                    value_index.setdefault(val.lower(), []).append((order, key, val))
+                order += 1
+
+        phrases = []
+        phrase_targets = []
+        for phrase, mapping in (phrase_map or {}).items():
+            if not isinstance(phrase, str) or not isinstance(mapping, dict):
+                continue
+            phrases.append(phrase)
+            phrase_targets.append((mapping.get("key"), mapping.get("value")))
+        return value_index, PhraseMatcher(phrases), phrase_targets, {}
+
+    def _install(self, compiled):
+        self._compiled = compiled
+        self.value_index, self.phrase_matcher, self.phrase_targets, self._phrase_cache = self._compiled
+
+    @staticmethod
+    def _phrase_hits(compiled, tag):
+        _, phrase_matcher, phrase_targets, phrase_cache = compiled
+        hits = phrase_cache.get(tag)
+        if hits is None:
+            hits = []
+            for idx in sorted(phrase_matcher.find(tag)):
+                key, value = phrase_targets[idx]
+                if key and value:
+                    hits.append((key, value))
+            if len(phrase_cache) >= PHRASE_CACHE_SIZE:
+                phrase_cache.clear()
+            phrase_cache[tag] = hits
+        return hits
 
     def map_tags(self, tags):
         result = {}
         lower_tags = [t.lower() for t in tags]
+        compiled = self._compiled
+        value_index = compiled[0]
 
-        # Direct value match
-        for key, values in self.attributes_map.items():
-            for val in values:
-                if val.lower() in lower_tags:
-                    result.setdefault(key, []).append(val)
+        # Direct value match, in attributes.yaml order
+        hits = []
+        for tag in set(lower_tags):
+            hits.extend(value_index.get(tag, ()))
+        hits.sort()
+        for _, key, val in hits:
+            result.setdefault(key, []).append(val)
 
-        # Phrase-based fuzzy mapping
+        # Phrase-based fuzzy mapping, in tag order then phrase_map order
         for tag in lower_tags:
-            for phrase, mapping in self.phrase_map.items():
-                if phrase in tag:
-                    key = mapping.get("key")
-                    value = mapping.get("value")
-                    if key and value:
-                        result.setdefault(key, []).append(value)
+            for key, value in self._phrase_hits(compiled, tag):
+                result.setdefault(key, []).append(value)
 
         return result
 
+    def map_tags_many(self, tag_lists):
+        return [self.map_tags(tags) for tags in tag_lists]
+
     def get_required_keys(self):
         return self.required_keys
 
@@ -64,8 +257,24 @@ tag_mapper = TagMapper()
 def map_tags(tags):
     return tag_mapper.map_tags(tags)
 
+def map_tags_many(tag_lists):
+    return tag_mapper.map_tags_many(tag_lists)
+
 def get_required_keys():
     return tag_mapper.get_required_keys()
 
 def load_attribute_yaml():
     return tag_mapper.load_attribute_yaml()
+
+def get_semantic_thresholds():
+    return tag_mapper.semantic_thresholds
+
+def reload_if_changed(min_interval=RELOAD_CHECK_SECONDS):
+    return tag_mapper.reload_if_changed(min_interval)
+
+def merge_semantic(mapped_tags, semantic_tags):
+    """Append semantic matches to the hard-mapped attributes in place."""
+    for k, vlist in semantic_tags.items():
+        for v in vlist:
+            mapped_tags.setdefault(k, []).append(v)
+    return mapped_tags
@@ -0,0 +1,201 @@
+# core/migrate.py
+import os
+import json
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import yaml
+
+from core import scanner, generator, config_reader, logger
+
+MIGRATE_WORKERS = os.cpu_count() or 4
+PROGRESS_EVERY = 5000
+
+# kind is "rename" or "delete"; value and new_value are None for whole-key rules
+Rule = namedtuple("Rule", "kind key value new_key new_value")
+
+def _split(spec):
+    """'key: value' -> (key, value), 'key' -> (key, None)."""
+    key, sep, value = spec.partition(":")
+    key = key.strip()
+    value = value.strip() if sep else None
+    if not key or value == "":
+        raise ValueError(f"Invalid attribute spec: {spec!r}")
+    return key, value
+
+def rename_rule(old, new):
+    """
+    Rule for 'key: value' -> 'key: value' (a merge when the target value
+    is already present) or 'key' -> 'key' (every value moves to the new key).
+    """
+    key, value = _split(old)
+    new_key, new_value = _split(new)
+    if (value is None) != (new_value is None):
+        raise ValueError(f"Rename must map a key to a key or a value to a value: {old!r} -> {new!r}")
+    return Rule("rename", key, value, new_key, new_value)
+
+def delete_rule(spec):
+    key, value = _split(spec)
+    return Rule("delete", key, value, None, None)
+
+def rule_label(rule):
+    old = rule.key if rule.value is None else f"{rule.key}: {rule.value}"
+    if rule.kind == "delete":
+        return f"delete {old}"
+    new = rule.new_key if rule.new_value is None else f"{rule.new_key}: {rule.new_value}"
+    return f"rename {old} -> {new}"
+
+def load_rules(path):
+    """
+    Read rules from a YAML file of the form
+
+        rename:
+          "held: dual-wield": "held: melee"
+          faction: allegiance
+        delete:
+          - "theme: urban"
+          - pose
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    if not isinstance(data, dict):
+        raise ValueError(f"Migration rules file format invalid: {path}")
+    rules = [rename_rule(str(old), str(new)) for old, new in (data.get("rename") or {}).items()]
+    rules += [delete_rule(str(spec)) for spec in data.get("delete") or []]
+    return rules
+
+def _match(rules, key, value):
+    """First rule for key: value; value rules take precedence over whole-key rules."""
+    for rule in rules:
+        if rule.key == key and rule.value == value:
+            return rule
+    for rule in rules:
+        if rule.key == key and rule.value is None:
+            return rule
+    return None
+
+def apply_rules(attributes, rules):
+    """
+    Apply rules to a modelmeta.attributes list of {"key", "value"} items.
+    Returns (new list, [rule index per change]). Items keep their order and
+    any other fields; a renamed item that duplicates one already kept is
+    dropped, and so is a later one equal to a renamed item, which is how
+    merges collapse.
+    """
+    hits = []
+    result = []
+    seen = set()
+    renamed = set()
+    for item in attributes:
+        if not isinstance(item, dict):
+            result.append(item)
+            continue
+        key, value = item.get("key"), item.get("value")
+        rule = _match(rules, key, value)
+        if rule is None:
+            # Already present as the target of an earlier rename
+            if (key, value) not in renamed:
+                seen.add((key, value))
+                result.append(item)
+            continue
+        hits.append(rules.index(rule))
+        if rule.kind == "delete":
+            continue
+        key = rule.new_key
+        value = value if rule.new_value is None else rule.new_value
+        if (key, value) in seen:
+            continue
+        seen.add((key, value))
+        renamed.add((key, value))
+        result.append(dict(item, key=key, value=value))
+    return result, hits
+
+def migrate_config(path, rules, dry_run=False):
+    """
+    Apply rules to one config.orynt3d. Returns (changed, hits), hits being
+    the index of the rule behind every change. Everything outside
+    modelmeta.attributes is kept, and the file is only rewritten when its
+    attributes change.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    meta = data.get("modelmeta") if isinstance(data, dict) else None
+    attributes = meta.get("attributes") if isinstance(meta, dict) else None
+    if not isinstance(attributes, list):
+        return False, []
+    new_attributes, hits = apply_rules(attributes, rules)
+    if new_attributes == attributes:
+        return False, hits
+    if not dry_run:
+        meta["attributes"] = new_attributes
+        folder = os.path.dirname(path)
+        if generator.write_if_changed(path, generator.serialize_config(data)):
+            config_reader.invalidate(folder)
+    return True, hits
+
+def _migrate_one(path, rules, dry_run):
+    """Worker entry point; errors come back as values so one bad file doesn't stop the run."""
+    try:
+        return path, migrate_config(path, rules, dry_run), None
+    except Exception as e:
+        return path, (False, []), str(e)
+
+def iter_configs(root):
+    for dirpath, _, filenames in scanner.walk(root):
+        if config_reader.CONFIG_NAME in filenames:
+            yield os.path.join(dirpath, config_reader.CONFIG_NAME)
+
+class MigrationReport:
+    def __init__(self, rules):
+        self.rules = rules
+        self.scanned = 0
+        self.changed = 0
+        self.failed = 0
+        self.rule_items = [0] * len(rules)
+        self.rule_files = [0] * len(rules)
+
+    def add(self, changed, hits):
+        self.scanned += 1
+        self.changed += changed
+        for index in hits:
+            self.rule_items[index] += 1
+        for index in set(hits):
+            self.rule_files[index] += 1
+
+    def log(self, dry_run=False):
+        verb = "would change" if dry_run else "changed"
+        logger.info("%d configs scanned, %d %s, %d failed", self.scanned, self.changed, verb, self.failed)
+        for rule, items, files in zip(self.rules, self.rule_items, self.rule_files):
+            logger.info("  %s: %d attributes in %d configs", rule_label(rule), items, files)
+
+def migrate_library(root, rules, dry_run=False, workers=MIGRATE_WORKERS, executor="thread"):
+    """
+    Apply rules to every config.orynt3d below root. Paths are streamed from
+    the scanner to a worker pool with a bounded number in flight. Returns
+    a MigrationReport.
+    """
+    report = MigrationReport(rules)
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    in_flight = deque()
+    max_in_flight = workers * 8
+
+    def take(future):
+        path, (changed, hits), error = future.result()
+        if error is not None:
+            report.failed += 1
+            logger.warning("Could not migrate %s: %s", path, error)
+            return
+        report.add(changed, hits)
+        if changed:
+            logger.debug("%s %s", "Would change" if dry_run else "Changed", path)
+        if report.scanned % PROGRESS_EVERY == 0:
+            logger.info("%d configs scanned, %d changed", report.scanned, report.changed)
+
+    with pool_class(max_workers=workers) as pool:
+        for path in iter_configs(root):
+            in_flight.append(pool.submit(_migrate_one, path, rules, dry_run))
+            if len(in_flight) >= max_in_flight:
+                take(in_flight.popleft())
+        while in_flight:
+            take(in_flight.popleft())
+    return report
@@ -0,0 +1,233 @@
+# core/netio.py
+import os
+import time
+import errno
+import random
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from core import scanner, indexer, config_reader, logger
+
+IO_CONCURRENCY = 16
+READ_AHEAD = 32
+RETRIES = 3
+BACKOFF = 0.1
+MAX_BACKOFF = 2.0
+
+# errno and Windows error codes worth retrying on a share: timeouts, dropped
+# connections and "network name no longer available" style failures
+TRANSIENT_ERRNOS = {errno.EAGAIN, errno.EBUSY, errno.EIO, errno.EINTR, errno.ETIMEDOUT,
+                    errno.ECONNRESET, errno.ECONNABORTED, errno.EHOSTUNREACH, errno.ENETUNREACH,
+                    errno.ENETRESET, errno.ESTALE}
+TRANSIENT_WINERRORS = {53, 59, 64, 67, 121, 1231, 1236}
+
+def is_transient(error):
+    if isinstance(error, (FileNotFoundError, PermissionError, IsADirectoryError, NotADirectoryError)):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return getattr(error, "winerror", None) in TRANSIENT_WINERRORS or error.errno in TRANSIENT_ERRNOS
+
+class RemoteIO:
+    """
+    File access for libraries on a network share, where every stat, listing
+    and open is a round trip:
+
+    - at most concurrency operations are in flight at once, across the
+      scanner, the read-ahead pool and the callers' own threads;
+    - scan_dir() lists a directory with names and entry types in one
+      scandir call, for scanner.walk(..., scan_dir=io.scan_dir);
+    - read_ahead() reads the sidecars and config of upcoming folders in the
+      background so the caller finds them in memory, and prefetch() those
+      of folders about to be processed;
+    - operations failing with a transient error are retried up to retries
+      times with exponential backoff and jitter.
+
+    latency (seconds) and fail_rate make a local test shim: every operation
+    first sleeps for latency and then fails with a transient error with
+    probability fail_rate, which is enough to measure the gains, and the
+    retries, without a real share.
+    """
+
+    def __init__(self, concurrency=IO_CONCURRENCY, read_ahead=READ_AHEAD, retries=RETRIES, backoff=BACKOFF,
+                 latency=0.0, fail_rate=0.0):
+        self.concurrency = concurrency
+        self.read_ahead_depth = read_ahead
+        self.retries = retries
+        self.backoff = backoff
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.operations = 0
+        self.retried = 0
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._ahead = {}  # path -> (folder, Future of its bytes (None when missing))
+        self._unread = {}  # folder -> its paths read ahead and not collected yet
+        self._queued = OrderedDict()  # folder -> paths, waiting for a read-ahead slot
+        self._depth = 0
+        self._pool = None
+
+    def _run(self, fn, *args):
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                with self._slots:
+                    with self._lock:
+                        self.operations += 1
+                    if self.latency:
+                        time.sleep(self.latency)
+                    if self.fail_rate and random.random() < self.fail_rate:
+                        raise TimeoutError(errno.ETIMEDOUT, "injected transient failure")
+                    return fn(*args)
+            except OSError as e:
+                if attempt == self.retries or not is_transient(e):
+                    raise
+                with self._lock:
+                    self.retried += 1
+                logger.debug("Retrying after transient error (%s), attempt %d", e, attempt + 1)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay = min(delay * 2, MAX_BACKOFF)
+
+    # Operations
+
+    def stat(self, path):
+        return self._run(os.stat, path)
+
+    def scan_dir(self, path):
+        """scanner.list_dir through the I/O limits; a directory that keeps failing is skipped with a warning."""
+        try:
+            return self._run(scanner.list_dir, path)
+        except OSError as e:
+            logger.warning("Could not list %s: %s", path, e)
+            return path, [], []
+
+    def _read(self, path):
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def read_bytes(self, path):
+        """Contents of path, or None when it doesn't exist. Served from read-ahead when available."""
+        with self._lock:
+            folder, future = self._ahead.pop(path, (None, None))
+            if future is not None:
+                self._collected(folder, path)
+        if future is not None:
+            try:
+                return future.result()
+            except OSError:
+                pass  # read again below, with the caller seeing any error
+        return self._run(self._read, path)
+
+    # Read-ahead
+
+    @staticmethod
+    def _paths(folder, xmp_files):
+        return list(xmp_files) + [os.path.join(folder, config_reader.CONFIG_NAME)]
+
+    def _submit(self, folder, paths):
+        # Called with self._lock held
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="read-ahead")
+        unread = self._unread.setdefault(folder, set())
+        for path in paths:
+            if path not in self._ahead:
+                self._ahead[path] = (folder, self._pool.submit(self._run, self._read, path))
+                unread.add(path)
+        if not unread:
+            del self._unread[folder]
+
+    def _fill(self):
+        # Called with self._lock held: start queued folders while there is room
+        while self._queued and len(self._unread) < self._depth:
+            self._submit(*self._queued.popitem(last=False))
+
+    def _collected(self, folder, path):
+        # Called with self._lock held
+        unread = self._unread.get(folder)
+        if unread is not None:
+            unread.discard(path)
+            if not unread:
+                del self._unread[folder]
+                self._fill()
+
+    def read_ahead(self, folders, depth=None):
+        """
+        Pass through an iterable of (folder, xmp_files), reading the
+        sidecars and config.orynt3d of upcoming folders in the background,
+        at most depth folders (default: the read_ahead given to the
+        constructor) with reads nobody has collected yet. A read is kept
+        until read_bytes() collects it or release() drops its folder, so
+        callers may take many folders before reading any of them.
+        """
+        depth = self.read_ahead_depth if depth is None else depth
+        if depth <= 0:
+            yield from folders
+            return
+        self._depth = depth
+        upcoming = deque()
+        folders = iter(folders)
+        while True:
+            while len(upcoming) < depth:
+                item = next(folders, None)
+                if item is None:
+                    break
+                folder, xmp_files = item
+                with self._lock:
+                    self._queued[folder] = self._paths(folder, xmp_files)
+                    self._fill()
+                upcoming.append(item)
+            if not upcoming:
+                return
+            yield upcoming.popleft()
+
+    def prefetch(self, folders):
+        """
+        Start reading the sidecars and config of every (folder, xmp_files)
+        in folders now, regardless of the read-ahead depth: for a batch the
+        caller is about to process.
+        """
+        with self._lock:
+            for folder, xmp_files in folders:
+                self._submit(folder, self._queued.pop(folder, None) or self._paths(folder, xmp_files))
+
+    def release(self, folder):
+        """Drop whatever was read ahead for folder and not collected, once the caller is done with it."""
+        with self._lock:
+            self._queued.pop(folder, None)
+            for path in self._unread.pop(folder, ()):
+                self._ahead.pop(path)[1].cancel()
+            self._fill()
+
+    def close(self):
+        with self._lock:
+            futures = [future for _, future in self._ahead.values()]
+            self._ahead.clear()
+            self._unread.clear()
+            self._queued.clear()
+        for future in futures:
+            future.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    # Drop-in readers for the pipeline and main
+
+    def read_tags(self, xmp_path):
+        try:
+            data = self.read_bytes(xmp_path)
+        except OSError as e:
+            logger.error("Failed to read %s: %s", xmp_path, e)
+            return []
+        return indexer.get_tags_from_bytes(data, xmp_path) if data is not None else []
+
+    def load_existing_attributes(self, folder):
+        try:
+            data = self.read_bytes(os.path.join(folder, config_reader.CONFIG_NAME))
+        except OSError as e:
+            logger.warning("Failed to load existing config attributes for %s: %s", folder, e)
+            return {}
+        return config_reader.attributes_from_bytes(data, folder)
@@ -0,0 +1,233 @@
+# core/pipeline.py
+import time
+import queue
+import threading
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from core import indexer, mapper, generator, logger, semantic
+from core.logger import StageStats
+from core.catalog import HARD, SEMANTIC
+from core.journal import WRITTEN, UNCHANGED, DEFERRED
+
+_DONE = object()
+BATCH_LINGER = 0.05
+
+def parse_folder(folder, xmp_files, load_existing, read_tags=indexer.get_tags_from_xmp):
+    """
+    Parse stage work item, one folder with all its sidecars; runs on the
+    thread or process pool. Returns its parse and map times last.
+    """
+    start = time.perf_counter()
+    tag_lists, raw_tags, _ = indexer.get_folder_tags(xmp_files, read_tags)
+    existing_attrs = load_existing(folder)
+    parsed = time.perf_counter()
+    mapped_tags = mapper.map_tags(raw_tags)
+    return (folder, xmp_files, tag_lists, raw_tags, mapped_tags, existing_attrs,
+            parsed - start, time.perf_counter() - parsed)
+
+class Pipeline:
+    """
+    Three-stage config generation: parse (XMP + hard mapping + existing
+    config, on a pool), batched semantic mapping, and config writing. The
+    unit of work is a folder: its sidecars' tags are merged, mapped once
+    and written to one config. Stages are connected by bounded queues so a
+    slow stage holds back the ones before it. Items keep their input order
+    through every stage, so the configs written match a sequential run in
+    which every prompt is left blank, or, given an UnattendedPolicy, a
+    headless sequential run.
+
+    With a Catalog, tags and existing configs are read from it when fresh
+    and everything parsed, mapped and written is recorded in it. Process
+    pool workers can't share the connection, so they read from disk and
+    the write stage records what they parsed. load_existing(folder) and
+    read_tags(xmp_path) do the file reads; pass a netio.RemoteIO's for
+    libraries on a network share.
+    """
+
+    def __init__(self, load_existing, workers=4, executor="thread",
+                 batch_size=semantic.SEMANTIC_BATCH_SIZE, queue_size=1024, policy=None, catalog=None,
+                 read_tags=indexer.get_tags_from_xmp):
+        self.load_existing = load_existing
+        self.read_tags = read_tags
+        self.catalog = catalog
+        if catalog is not None and executor == "thread":
+            self.load_existing = partial(catalog.read_existing, load=load_existing)
+            self.read_tags = partial(catalog.read_tags, parse=read_tags)
+        self.policy = policy
+        self.workers = workers
+        self.executor = executor
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.stats = {name: StageStats(name) for name in ("parse", "semantic", "write")}
+        self.unchanged = 0
+        self._errors = []
+        self._stop = threading.Event()
+
+    def _make_executor(self):
+        if self.executor == "process":
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q, timeout=None):
+        """Blocking get that gives up once the pipeline is stopping, or after timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stop.is_set():
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Empty
+            try:
+                return q.get(timeout=wait)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _take_parsed(self, future, out_q):
+        result = future.result()
+        parse_seconds, map_seconds = result[-2:]
+        self.stats["parse"].add(1, parse_seconds + map_seconds)
+        logger.metrics.add("parse", len(result[1]), parse_seconds)
+        logger.metrics.add("map", 1, map_seconds)
+        return self._put(out_q, result[:-2])
+
+    def _parse_stage(self, folders, out_q):
+        in_flight = deque()
+        max_in_flight = self.workers * 4
+        try:
+            with self._make_executor() as pool:
+                for folder, xmp_files in folders:
+                    if self._stop.is_set():
+                        break
+                    in_flight.append(pool.submit(parse_folder, folder, xmp_files, self.load_existing, self.read_tags))
+                    if len(in_flight) >= max_in_flight:
+                        if not self._take_parsed(in_flight.popleft(), out_q):
+                            break
+                while in_flight and not self._stop.is_set():
+                    if not self._take_parsed(in_flight.popleft(), out_q):
+                        break
+                for future in in_flight:
+                    future.cancel()
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(out_q, _DONE)
+
+    def _semantic_stage(self, in_q, out_q):
+        stats = self.stats["semantic"]
+        try:
+            done = False
+            while not done:
+                batch = [self._get(in_q)]
+                while batch[-1] is not _DONE and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._get(in_q, timeout=BATCH_LINGER))
+                    except queue.Empty:
+                        break
+                if batch[-1] is _DONE:
+                    batch.pop()
+                    done = True
+                if not batch:
+                    continue
+                # Edits to attributes.yaml apply from the next batch on (process workers keep their copy)
+                mapper.reload_if_changed()
+                start = time.perf_counter()
+                semantic_lists = semantic.semantic_map_batch(
+                    [item[3] for item in batch], batch_size=self.batch_size, with_scores=True
+                )
+                elapsed = time.perf_counter() - start
+                stats.add(len(batch), elapsed)
+                logger.metrics.add("semantic", len(batch), elapsed)
+                for item, semantic_result in zip(batch, semantic_lists):
+                    if not self._put(out_q, item + semantic_result):
+                        return
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(out_q, _DONE)
+
+    def _write_stage(self, in_q, on_complete):
+        stats = self.stats["write"]
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                return
+            folder, xmp_files, tag_lists, _, mapped_tags, existing_attrs, semantic_tags, semantic_scores = item
+            start = time.perf_counter()
+            hard_keys = set(mapped_tags)
+            if self.catalog is not None:
+                if self.executor != "thread":
+                    for xmp_file, tags in zip(xmp_files, tag_lists):
+                        self.catalog.record_sidecar(xmp_file, tags)
+                self.catalog.record_attributes(folder, HARD, mapped_tags)
+                self.catalog.record_attributes(folder, SEMANTIC, semantic_tags)
+            mapper.merge_semantic(mapped_tags, semantic_tags)
+            mapped_tags.update(existing_attrs)
+            if self.policy is not None:
+                mapped_tags = self.policy.resolve(folder, mapped_tags, hard_keys, existing_attrs, semantic_scores)
+            outcome = DEFERRED
+            if mapped_tags is not None:
+                if generator.generate_config(folder, mapped_tags):
+                    outcome = WRITTEN
+                    logger.count("configs written")
+                else:
+                    outcome = UNCHANGED
+                    self.unchanged += 1
+                    logger.count("configs unchanged")
+                if self.catalog is not None:
+                    self.catalog.record_config(folder, mapped_tags)
+            elapsed = time.perf_counter() - start
+            stats.add(1, elapsed)
+            logger.metrics.add("write", 1, elapsed)
+            if on_complete is not None:
+                on_complete(folder, xmp_files, outcome, mapped_tags)
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._stop.set()
+
+    def run(self, folders, on_complete=None):
+        """
+        Process every (folder, xmp_files) pair in folders, as yielded by
+        scanner.iter_folder_sidecars. on_complete(folder, xmp_files, outcome,
+        attributes) is called from the calling thread after each folder is
+        done: outcome is journal.WRITTEN, UNCHANGED or DEFERRED, and
+        attributes what was written (None when deferred).
+        """
+        parsed_q = queue.Queue(maxsize=self.queue_size)
+        mapped_q = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._parse_stage, args=(folders, parsed_q), daemon=True),
+            threading.Thread(target=self._semantic_stage, args=(parsed_q, mapped_q), daemon=True),
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            self._write_stage(mapped_q, on_complete)
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+            semantic.flush()
+        elapsed = time.perf_counter() - start
+
+        for stats in self.stats.values():
+            logger.debug("Pipeline %s", stats)
+        written = self.stats["write"].items
+        logger.info("Pipeline total: %d folders in %.2fs (%.1f/s), %d configs already up to date",
+                    written, elapsed, written / elapsed if elapsed else 0, self.unchanged)
+        if self._errors:
+            raise self._errors[0]
+        return self.stats
@@ -0,0 +1,317 @@
+# core/review_queue.py
+import os
+import json
+from array import array
+from collections import OrderedDict
+
+from core import mapper, logger
+
+POLICIES = ("skip", "keep", "defer")
+MIN_CONFIDENCE = 0.65
+PREFETCH = 8
+CACHE_SIZE = 256
+
+def is_legacy_queue(path):
+    """True for the original queue format: one JSON list of [folder, attributes] pairs."""
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip()
+    return head.startswith(b"[") and not head.startswith(b'["')
+
+def iter_legacy_queue(path):
+    with open(path, "r", encoding="utf-8") as f:
+        queue = json.load(f)
+    if not isinstance(queue, list) or not all(isinstance(i, list) and len(i) == 2 for i in queue):
+        raise ValueError("Invalid review queue format.")
+    return iter(queue)
+
+def discard_progress(path):
+    """Remove the .idx and .state files ReviewQueue keeps next to a queue file that is being replaced."""
+    for sibling in (path + ".idx", path + ".state"):
+        try:
+            os.remove(sibling)
+        except FileNotFoundError:
+            pass
+
+def convert_legacy_queue(path, jsonl_path=None):
+    """Rewrite a legacy JSON list queue as JSON Lines; returns the new path."""
+    jsonl_path = jsonl_path or os.path.splitext(path)[0] + ".jsonl"
+    tmp_path = jsonl_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for folder, attributes in iter_legacy_queue(path):
+            f.write(json.dumps([folder, attributes]) + "\n")
+    os.replace(tmp_path, jsonl_path)
+    discard_progress(jsonl_path)
+    return jsonl_path
+
+def _is_complete(line):
+    try:
+        json.loads(line)
+        return True
+    except ValueError:
+        return False
+
+class ReviewQueueWriter:
+    """
+    Appends [folder, attributes] lines to a JSON Lines review queue for
+    core/gui_manual_review. The file is append-only so an open reviewer's
+    offset index and progress stay valid; folders that are already queued
+    are not added again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.folders = set()
+        self.pending = []
+        if not os.path.isfile(path):
+            # Progress left over from a deleted queue doesn't describe the new one
+            discard_progress(path)
+            return
+        try:
+            if is_legacy_queue(path):
+                convert_legacy_queue(path, path)
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self.folders.add(json.loads(line)[0])
+        except Exception as e:
+            logger.warning("Could not read existing review queue %s: %s", path, e)
+
+    def __len__(self):
+        return len(self.folders)
+
+    def add(self, folder, attributes):
+        if folder in self.folders:
+            return
+        self.folders.add(folder)
+        self.pending.append([folder, attributes])
+
+    def save(self):
+        if not self.pending:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for item in self.pending:
+                f.write(json.dumps(item) + "\n")
+        self.pending = []
+
+class ReviewQueue:
+    """
+    Lazily paged review queue over a JSON Lines file of [folder, attributes]
+    items. Line offsets are kept in <path>.idx so opening a large queue only
+    reads the lines added since the last time, and items are read on demand
+    a few at a time. Per-item progress is one byte per item in <path>.state
+    (see UNREVIEWED, REVIEWED, SAVED), written in place as the reviewer works.
+    """
+
+    UNREVIEWED, REVIEWED, SAVED = 0, 1, 2
+
+    def __init__(self, path, prefetch=PREFETCH):
+        self.path = path
+        self.prefetch = prefetch
+        self.index_path = path + ".idx"
+        self.state_path = path + ".state"
+        self.offsets = array("Q")
+        self.cache = OrderedDict()
+        self.edits = {}
+        self._file = open(path, "rb")
+        self._load_index()
+        self._open_state()
+
+    def _load_index(self):
+        size = os.path.getsize(self.path)
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, "rb") as f:
+                self.offsets.frombytes(f.read())
+        # offsets holds every line start plus the end of the last indexed line
+        if not self._index_matches(size):
+            self.offsets = array("Q", [0])
+            self._reset_state = True
+        else:
+            self._reset_state = False
+        if self.offsets[-1] < size:
+            self._scan_from(self.offsets[-1])
+            with open(self.index_path, "wb") as f:
+                self.offsets.tofile(f)
+
+    def _index_matches(self, size):
+        """
+        Whether the saved offsets still describe the file: the last indexed
+        line must be a whole item starting and ending where they say. A
+        queue recreated or rewritten since then fails this.
+        """
+        if len(self.offsets) < 2:
+            return len(self.offsets) == 1 and self.offsets[0] <= size
+        start, end = self.offsets[-2], self.offsets[-1]
+        if end > size or start >= end:
+            return False
+        self._file.seek(max(start - 1, 0))
+        data = self._file.read(end - max(start - 1, 0))
+        if start and not data.startswith(b"\n"):
+            return False
+        # The segment may end with blank lines folded into it by _scan_from
+        line = (data[1:] if start else data).strip()
+        return b"\n" not in line and _is_complete(line)
+
+    def _scan_from(self, offset):
+        self._file.seek(offset)
+        for line in iter(self._file.readline, b""):
+            if not line.endswith(b"\n") and not _is_complete(line):
+                break  # partially written line; pick it up next time
+            offset += len(line)
+            if line.strip():
+                self.offsets.append(offset)
+            else:
+                self.offsets[-1] = offset
+
+    def _open_state(self):
+        count = len(self)
+        mode = "r+b" if os.path.isfile(self.state_path) and not self._reset_state else "w+b"
+        self._state_file = open(self.state_path, mode)
+        state = self._state_file.read()
+        if len(state) < count:
+            self._state_file.write(bytes(count - len(state)))
+            self._state_file.flush()
+            state += bytes(count - len(state))
+        self.state = bytearray(state[:count])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _read(self, start, stop):
+        self._file.seek(self.offsets[start])
+        data = self._file.read(self.offsets[stop] - self.offsets[start])
+        items = []
+        for line in data.splitlines():
+            if line.strip():
+                folder, attributes = json.loads(line)
+                items.append((folder, attributes))
+        return items
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        if i in self.edits:
+            return self.edits[i]
+        item = self.cache.get(i)
+        if item is None:
+            stop = min(i + 1 + self.prefetch, len(self))
+            for pos, loaded in enumerate(self._read(i, stop), start=i):
+                self.cache[pos] = loaded
+            while len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+            item = self.cache[i]
+        return item
+
+    def status(self, i):
+        return self.state[i]
+
+    def _set_state(self, i, value):
+        if self.state[i] >= value:
+            return
+        self.state[i] = value
+        self._state_file.seek(i)
+        self._state_file.write(bytes([value]))
+        self._state_file.flush()
+
+    def mark_reviewed(self, i):
+        self._set_state(i, self.REVIEWED)
+
+    def mark_saved(self, i, attributes):
+        folder, _ = self[i]
+        self.edits[i] = (folder, attributes)
+        self._set_state(i, self.SAVED)
+
+    def first_unreviewed(self):
+        pos = self.state.find(self.UNREVIEWED)
+        return pos if pos >= 0 else max(len(self) - 1, 0)
+
+    def close(self):
+        self._file.close()
+        self._state_file.close()
+
+class ListReviewQueue:
+    """In-memory queue with the same interface as ReviewQueue, for callers passing a plain list."""
+
+    def __init__(self, items=()):
+        self.items = [tuple(item) for item in items]
+        self.state = bytearray(len(self.items))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+    def status(self, i):
+        return self.state[i]
+
+    def mark_reviewed(self, i):
+        self.state[i] = max(self.state[i], ReviewQueue.REVIEWED)
+
+    def mark_saved(self, i, attributes):
+        self.items[i] = (self.items[i][0], attributes)
+        self.state[i] = ReviewQueue.SAVED
+
+    def first_unreviewed(self):
+        pos = self.state.find(ReviewQueue.UNREVIEWED)
+        return pos if pos >= 0 else max(len(self) - 1, 0)
+
+    def close(self):
+        pass
+
+def open_review_queue(path):
+    """Open a queue file, converting a legacy JSON list queue to JSON Lines first."""
+    if is_legacy_queue(path):
+        jsonl_path = os.path.splitext(path)[0] + ".jsonl"
+        if not os.path.isfile(jsonl_path) or os.path.getmtime(jsonl_path) < os.path.getmtime(path):
+            convert_legacy_queue(path, jsonl_path)
+        path = jsonl_path
+    return ReviewQueue(path)
+
+class UnattendedPolicy:
+    """
+    Replaces the interactive prompts in a headless run. A key is missing when
+    it is required but has no value, and low-confidence when its only
+    values came from semantic matches scoring below min_confidence.
+
+    skip:  write the folder without its low-confidence keys
+    keep:  write the folder as mapped, like leaving every prompt blank
+    defer: don't write; queue the folder for manual review if any key is
+           missing or low-confidence
+    """
+
+    def __init__(self, policy="defer", required_keys=None, min_confidence=MIN_CONFIDENCE, queue=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {', '.join(POLICIES)}")
+        if required_keys is None:
+            vocabulary = mapper.load_attribute_yaml()
+            required_keys = [k for k in mapper.get_required_keys() if k in vocabulary]
+        self.policy = policy
+        self.required_keys = list(required_keys)
+        self.min_confidence = min_confidence
+        self.queue = queue
+        self.deferred = 0
+
+    def low_confidence_keys(self, hard_keys, existing_keys, semantic_scores):
+        return {
+            k for k, score in semantic_scores.items()
+            if score < self.min_confidence and k not in hard_keys and k not in existing_keys
+        }
+
+    def resolve(self, folder, attributes, hard_keys=(), existing_keys=(), semantic_scores=None):
+        """Return the attributes to write, or None if the folder was deferred."""
+        uncertain = self.low_confidence_keys(set(hard_keys), set(existing_keys), semantic_scores or {})
+        if self.policy == "skip":
+            return {k: v for k, v in attributes.items() if k not in uncertain}
+        if self.policy == "keep":
+            return attributes
+        missing = [k for k in self.required_keys if not attributes.get(k)]
+        if not missing and not uncertain:
+            return attributes
+        logger.info("Deferring %s: missing %s, low confidence %s", folder, missing, sorted(uncertain))
+        logger.count("folders deferred")
+        if self.queue is not None:
+            self.queue.add(folder, attributes)
+        self.deferred += 1
+        return None
@@ -1,18 +1,77 @@
 # core/scanner.py
 import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+SCAN_WORKERS = 8
+
+def list_dir(path):
+    """
+    List one directory in a single scandir pass, splitting entries into
+    visible subdirectories and files. Raises OSError if it can't be listed.
+    """
+    subdirs = []
+    files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                files.append(entry.name)
+            elif not entry.name.startswith('.') and not entry.is_symlink():
+                subdirs.append(entry.path)
+    return path, subdirs, files
+
+def _scan_dir(path):
+    try:
+        return list_dir(path)
+    except OSError:
+        return path, [], []
+
+def walk(root, max_workers=SCAN_WORKERS, scan_dir=_scan_dir):
+    """
+    Yield (dirpath, subdirs, filenames) for root and every non-hidden
+    directory below it. Hidden directories are pruned before they are
+    listed, and sibling subtrees are listed concurrently, so the order of
+    results is not deterministic. scan_dir(path) lists one directory; a
+    netio.RemoteIO supplies one for network shares.
+    """
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {pool.submit(scan_dir, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                dirpath, subdirs, filenames = future.result()
+                for subdir in subdirs:
+                    pending.add(pool.submit(scan_dir, subdir))
+                yield dirpath, subdirs, filenames
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def iter_model_folders(root, max_workers=SCAN_WORKERS):
+    for dirpath, _, _ in walk(root, max_workers):
+        yield dirpath
+
+def iter_xmp_files(root, max_workers=SCAN_WORKERS):
+    for dirpath, _, filenames in walk(root, max_workers):
+        for file in filenames:
+            if file.lower().endswith(".xmp"):
+                yield os.path.join(dirpath, file)
+
+def iter_folder_sidecars(root, max_workers=SCAN_WORKERS, scan_dir=_scan_dir):
+    """Yield (folder, sorted sidecar paths) for every folder below root that has .xmp sidecars."""
+    for dirpath, _, filenames in walk(root, max_workers, scan_dir):
+        xmp_files = sorted(os.path.join(dirpath, file) for file in filenames if file.lower().endswith(".xmp"))
+        if xmp_files:
+            yield dirpath, xmp_files
 
 def find_model_folders(root):
-    model_folders = []
-    for dirpath, dirnames, filenames in os.walk(root):
-        if not any(part.startswith('.') for part in dirpath.split(os.sep)):
-            model_folders.append(dirpath)
-    return model_folders
+    return sorted(iter_model_folders(root))
 
 def find_xmp_files(root):
-    xmp_files = []
-    for dirpath, dirnames, filenames in os.walk(root):
-        if not any(part.startswith('.') for part in dirpath.split(os.sep)):
-            for file in filenames:
-                if file.lower().endswith(".xmp"):
-                    xmp_files.append(os.path.join(dirpath, file))
-    return xmp_files
+    return sorted(iter_xmp_files(root))
+
+def find_folder_sidecars(root):
+    return sorted(iter_folder_sidecars(root))
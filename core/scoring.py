@@ -0,0 +1,109 @@
+# core/scoring.py
+import numpy as np
+
+PRECISIONS = ("float32", "float16", "int8")
+# float16 and int8 only shrink the stored matrix; scoring widens them back, so they are slower
+DEFAULT_PRECISION = "float32"
+DEFAULT_THRESHOLD = 0.55
+# Attribute rows widened to float32 at a time when scoring a float16 or int8 matrix
+SCORE_BLOCK = 4096
+
+def normalize_rows(matrix):
+    """Return matrix as float32 with every row scaled to unit length (zero rows stay zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def quantize_int8(matrix):
+    """Symmetric per-row int8 quantization; returns (int8 matrix, float32 per-row scale)."""
+    scale = np.abs(matrix).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    quantized = np.clip(np.rint(matrix / scale[:, None]), -127, 127).astype(np.int8)
+    return quantized, scale.astype(np.float32)
+
+class AttributeScorer:
+    """
+    Cosine scoring of tag embeddings against the attribute phrases, in
+    NumPy. The attribute embeddings are normalized once and stored as
+    float32, float16 or int8 (with a per-row scale); a batch of tags is
+    scored with a matrix multiply per SCORE_BLOCK attribute rows, widening
+    only that block to float32 for the product, so the compact matrix is
+    never copied whole. lookup[i] is the (key, value) pair of row i.
+
+    match() keeps up to k attributes per tag whose score is above the
+    threshold of their key; keys without an entry in thresholds use
+    default_threshold.
+    """
+
+    def __init__(self, embeddings, lookup, precision=DEFAULT_PRECISION, thresholds=None, default_threshold=DEFAULT_THRESHOLD):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}, expected one of {', '.join(PRECISIONS)}")
+        if len(lookup) != len(embeddings):
+            raise ValueError(f"{len(lookup)} lookup entries for {len(embeddings)} embeddings")
+        self.lookup = list(lookup)
+        self.precision = precision
+        self.default_threshold = default_threshold
+        self.thresholds = dict(thresholds or {})
+        self.row_thresholds = np.array(
+            [self.thresholds.get(key, default_threshold) for key, _ in self.lookup], dtype=np.float32
+        )
+
+        normalized = normalize_rows(embeddings) if len(embeddings) else np.zeros((0, 0), dtype=np.float32)
+        self.scale = None
+        if precision == "int8":
+            self.matrix, self.scale = quantize_int8(normalized)
+        else:
+            self.matrix = normalized.astype(precision)
+
+    def __len__(self):
+        return len(self.lookup)
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def scores(self, tag_embeddings):
+        """Cosine similarity of every tag against every attribute, shape (tags, attributes)."""
+        tags = normalize_rows(tag_embeddings)
+        if self.matrix.dtype == np.float32:
+            return tags @ self.matrix.T
+        scores = np.empty((len(tags), len(self.matrix)), dtype=np.float32)
+        for start in range(0, len(self.matrix), SCORE_BLOCK):
+            stop = start + SCORE_BLOCK
+            block = scores[:, start:stop]
+            np.matmul(tags, self.matrix[start:stop].T.astype(np.float32), out=block)
+            if self.scale is not None:
+                block *= self.scale[start:stop]
+        return scores
+
+    def top_k(self, tag_embeddings, k=1):
+        """Return (indices, scores), each (tags, k), best match first."""
+        scores = self.scores(tag_embeddings)
+        k = min(k, scores.shape[1])
+        if k == 1:
+            idx = scores.argmax(axis=1)[:, None]
+        else:
+            idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1)
+            idx = np.take_along_axis(idx, order, axis=1)
+        return idx, np.take_along_axis(scores, idx, axis=1)
+
+    def match(self, tag_embeddings, k=1):
+        """
+        For each tag, the list of (key, value, score) among its top k
+        attributes that clear their key's threshold, best first.
+        """
+        if not len(self.lookup):
+            return [[] for _ in range(len(tag_embeddings))]
+        idx, top_scores = self.top_k(tag_embeddings, k)
+        passed = top_scores > self.row_thresholds[idx]
+        results = []
+        for row_idx, row_scores, row_passed in zip(idx.tolist(), top_scores.tolist(), passed.tolist()):
+            results.append([
+                self.lookup[i] + (score,)
+                for i, score, ok in zip(row_idx, row_scores, row_passed) if ok
+            ])
+        return results
@@ -0,0 +1,191 @@
+# core/semantic.py
+import os
+import glob
+import hashlib
+
+import numpy as np
+
+from core import mapper, logger
+from core.embedding_cache import EmbeddingCache
+from core.scoring import AttributeScorer, DEFAULT_PRECISION
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+# Default cutoff; per-key overrides come from the semantic_thresholds section of attributes.yaml
+SEMANTIC_THRESHOLD = 0.55
+SEMANTIC_BATCH_SIZE = 256
+SEMANTIC_TOP_K = 1
+SEMANTIC_PRECISION = os.environ.get("ORYNT3D_SEMANTIC_PRECISION", DEFAULT_PRECISION)
+
+# Everything below is built on first use so importing this module stays cheap.
+_model = None
+_model_name = MODEL_NAME
+_cache = None
+_attribute_lookup = None
+_attribute_embeddings = None
+_attribute_source = None
+_scorer = None
+
+def get_model():
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        logger.info("Loading embedding model %s", _model_name)
+        _model = SentenceTransformer(_model_name)
+    return _model
+
+def set_model(model, name):
+    """
+    Use model (anything with a sentence-transformers style encode()) in place
+    of the default, e.g. a stub for offline benchmarks. name keys the
+    embedding cache and the saved attribute matrix, so it must differ from
+    any real model's name.
+    """
+    global _model, _model_name, _cache, _attribute_lookup, _attribute_embeddings, _attribute_source, _scorer
+    flush()
+    _model = model
+    _model_name = name
+    _cache = None
+    _attribute_lookup = _attribute_embeddings = _attribute_source = _scorer = None
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache(_model_name)
+    return _cache
+
+def encode_texts(texts, batch_size=SEMANTIC_BATCH_SIZE):
+    """Encode texts through the persistent cache; only unseen text reaches the model."""
+    return get_cache().encode(
+        texts, lambda missing: get_model().encode(missing, batch_size=batch_size, convert_to_numpy=True)
+    )
+
+def flush():
+    if _cache is not None:
+        _cache.flush()
+
+def build_attribute_phrases(attribute_yaml):
+    phrases = []
+    lookup = []
+    for key, values in attribute_yaml.items():
+        for v in values:
+            phrases.append(f"{key}: {v}")
+            lookup.append((key, v))
+    return phrases, lookup
+
+def attribute_matrix_path(yaml_path, content_sha1=None):
+    """
+    Path of the precomputed attribute embedding matrix for yaml_path, keyed by
+    a hash of the YAML contents (content_sha1 when given, so it matches what
+    was loaded rather than what is on disk now) and the model name.
+    """
+    digest = hashlib.sha1()
+    if content_sha1:
+        digest.update(content_sha1.encode("ascii"))
+    else:
+        with open(yaml_path, "rb") as f:
+            digest.update(f.read())
+    digest.update(_model_name.encode("utf-8"))
+    folder, name = os.path.split(os.path.abspath(yaml_path))
+    return os.path.join(folder, f".{name}.{digest.hexdigest()[:16]}.npy")
+
+def _save_attribute_matrix(path, embeddings):
+    prefix = path.rsplit(".", 2)[0]
+    for stale in glob.glob(glob.escape(prefix) + ".*.npy"):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, embeddings)
+    os.replace(tmp_path, path)
+
+def load_attribute_index():
+    """
+    Return (attribute_lookup, attribute_embeddings), loading the saved matrix
+    next to attributes.yaml when it matches, and encoding it otherwise.
+    Rebuilt whenever the mapper reloads attributes.yaml; phrases that were
+    already embedded come from the embedding cache, so only added or
+    changed ones reach the model.
+    """
+    global _attribute_lookup, _attribute_embeddings, _attribute_source, _scorer
+    source = (mapper.tag_mapper, mapper.tag_mapper.version)
+    if _attribute_embeddings is not None and _attribute_source == source:
+        return _attribute_lookup, _attribute_embeddings
+
+    phrases, lookup = build_attribute_phrases(mapper.load_attribute_yaml())
+    yaml_path = mapper.tag_mapper.yaml_path
+    matrix_path = attribute_matrix_path(yaml_path, mapper.tag_mapper.yaml_sha1) if os.path.isfile(yaml_path) else None
+
+    embeddings = None
+    if matrix_path and os.path.isfile(matrix_path):
+        try:
+            embeddings = np.load(matrix_path)
+            if embeddings.shape[0] != len(phrases):
+                embeddings = None
+        except Exception as e:
+            logger.warning("Ignoring unreadable attribute matrix %s: %s", matrix_path, e)
+            embeddings = None
+
+    if embeddings is None:
+        encoded = []
+
+        def encode_missing(missing):
+            encoded.append(len(missing))
+            return get_model().encode(missing, batch_size=SEMANTIC_BATCH_SIZE, convert_to_numpy=True)
+
+        embeddings = get_cache().encode(phrases, encode_missing)
+        flush()
+        logger.info("Attribute index: %d phrases, %d newly encoded", len(phrases), sum(encoded))
+        if matrix_path:
+            try:
+                _save_attribute_matrix(matrix_path, embeddings)
+            except OSError as e:
+                logger.warning("Could not save attribute matrix %s: %s", matrix_path, e)
+
+    _attribute_lookup, _attribute_embeddings, _attribute_source = lookup, embeddings, source
+    _scorer = None
+    return _attribute_lookup, _attribute_embeddings
+
+def get_scorer():
+    """The AttributeScorer over the attribute phrases, rebuilt when load_attribute_index() is."""
+    global _scorer
+    lookup, embeddings = load_attribute_index()
+    scorer = _scorer
+    if scorer is None:
+        thresholds = dict(mapper.get_semantic_thresholds())
+        default = thresholds.pop("default", SEMANTIC_THRESHOLD)
+        scorer = _scorer = AttributeScorer(embeddings, lookup, SEMANTIC_PRECISION, thresholds, default)
+    return scorer
+
+def semantic_map_batch(tag_lists, batch_size=SEMANTIC_BATCH_SIZE, with_scores=False, top_k=SEMANTIC_TOP_K):
+    """
+    Semantically map several tag lists at once.
+    Every distinct tag is encoded once, in chunks of batch_size, and scored
+    against all attribute phrases with a single tags x attributes product.
+    Each tag contributes up to top_k attributes that clear their key's
+    threshold. Returns one {key: [values]} dict per input list, or with
+    with_scores=True, one ({key: [values]}, {key: best score}) pair per list.
+    """
+    scorer = get_scorer()
+    unique_tags = list(dict.fromkeys(tag for tags in tag_lists for tag in tags))
+    matches = {}
+    for start in range(0, len(unique_tags), batch_size):
+        chunk = unique_tags[start:start + batch_size]
+        tag_embeddings = encode_texts(chunk, batch_size=batch_size)
+        matches.update(zip(chunk, scorer.match(tag_embeddings, top_k)))
+
+    results = []
+    for tags in tag_lists:
+        enriched = {}
+        key_scores = {}
+        for tag in tags:
+            for k, v, score in matches[tag]:
+                enriched.setdefault(k, []).append(v)
+                key_scores[k] = max(score, key_scores.get(k, score))
+        results.append((enriched, key_scores) if with_scores else enriched)
+    return results
+
+def semantic_map(raw_tags):
+    return semantic_map_batch([raw_tags])[0]
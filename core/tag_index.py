@@ -0,0 +1,198 @@
+# core/tag_index.py
+import os
+import bisect
+import operator
+import threading
+from array import array
+from itertools import chain, compress
+
+from core import indexer
+
+# Share of the keys a query must occur in before testing every key beats finding each one
+DENSE_MATCH = 1 / 16
+COUNT_AFTER = 256
+
+def _entries_containing(text, starts, query, limit):
+    """
+    Indices of the keys that contain query (which has no newline), or None
+    when it occurs more than limit times and testing every key is cheaper.
+    text is the keys joined by newlines and starts the offset of each in
+    it, so a selective query costs one str.find per matching key rather
+    than a test of every key.
+    """
+    hits = []
+    i = text.find(query)
+    while i >= 0:
+        k = bisect.bisect_right(starts, i) - 1
+        hits.append(k)
+        # Past a few hundred hits, one count() tells whether finding them all is worth it
+        if len(hits) == COUNT_AFTER and text.count(query) > limit:
+            return None
+        if k + 1 == len(starts):
+            break
+        i = text.find(query, starts[k + 1])
+    return hits
+
+def _joined(keys):
+    starts = array("Q")
+    offset = 0
+    for key in keys:
+        starts.append(offset)
+        offset += len(key) + 1
+    return "\n".join(keys), starts
+
+class TagIndex:
+    """
+    In-memory search index over a list of sidecars, addressed by position
+    in that list. Two inverted maps back search(): lowercase tag ->
+    positions and lowercase basename -> positions. A query is matched
+    against the distinct tags and basenames, not against every entry, and
+    the postings of those that match are combined. Entries start out
+    basename-only until build() or update() fills in their tags.
+    """
+
+    def __init__(self, paths=()):
+        self._lock = threading.Lock()
+        self.paths = []
+        self.names = []  # lowercase basename of each path
+        self.tags = []
+        self.mtimes = []
+        self.postings = {}  # tag -> set of positions
+        self.name_postings = {}  # basename -> list of positions
+        self._names = []  # distinct basenames, in the order first seen
+        self._name_text, self._name_starts = "", array("Q")
+        self._sorted_tags = None
+        self._tag_text, self._tag_starts = "", array("Q")
+        self.indexed = 0
+        self.extend(paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def extend(self, paths):
+        with self._lock:
+            for path in paths:
+                name = os.path.basename(path).lower()
+                positions = self.name_postings.get(name)
+                if positions is None:
+                    positions = self.name_postings[name] = []
+                    self._names.append(name)
+                positions.append(len(self.paths))
+                self.paths.append(path)
+                self.names.append(name)
+                self.tags.append(None)
+                self.mtimes.append(None)
+
+    def update(self, pos, tags, mtime_ns=None):
+        """Store the tags for the sidecar at pos, replacing any previous ones."""
+        tags = [tag.lower() for tag in tags]
+        with self._lock:
+            old_tags = self.tags[pos]
+            if old_tags is None:
+                self.indexed += 1
+            else:
+                for tag in set(old_tags):
+                    positions = self.postings.get(tag)
+                    if positions is not None:
+                        positions.discard(pos)
+                        if not positions:
+                            del self.postings[tag]
+                            self._sorted_tags = None
+            for tag in set(tags):
+                if tag not in self.postings:
+                    self.postings[tag] = set()
+                    self._sorted_tags = None
+                self.postings[tag].add(pos)
+            self.tags[pos] = tags
+            self.mtimes[pos] = mtime_ns
+
+    def refresh(self, pos):
+        """
+        Re-read the sidecar at pos if its mtime changed. Returns True when it
+        was re-indexed. A sidecar that can't be stat'ed is indexed with no
+        tags, so it still counts towards indexed, until it can be.
+        """
+        path = self.paths[pos]
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            if self.tags[pos] is not None:
+                return False
+            self.update(pos, [], None)
+            return True
+        if self.tags[pos] is not None and self.mtimes[pos] == mtime_ns:
+            return False
+        self.update(pos, indexer.get_tags_from_xmp(path), mtime_ns)
+        return True
+
+    def build(self, stop_event=None, start=0, until=None):
+        """
+        Index every sidecar from start onwards; meant to run on a background
+        thread. Given until, an Event, keep picking up paths added with
+        extend() while they are still arriving, until it is set.
+        """
+        pos = start
+        while True:
+            finished = until is None or until.is_set()
+            while pos < len(self.paths):
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                self.refresh(pos)
+                pos += 1
+            if finished:
+                return True
+            if stop_event is not None and stop_event.is_set():
+                return False
+            until.wait(0.1)
+
+    def _vocabulary(self):
+        # Called with self._lock held: bring the sorted tags and both joined texts up to date
+        if self._sorted_tags is None:
+            self._sorted_tags = sorted(self.postings)
+            self._tag_text, self._tag_starts = _joined(self._sorted_tags)
+        if len(self._name_starts) < len(self._names):
+            # Basenames are only ever added, so append the new ones
+            new_text, new_starts = _joined(self._names[len(self._name_starts):])
+            offset = len(self._name_text) + 1 if self._name_starts else 0
+            self._name_starts.extend(start + offset for start in new_starts)
+            self._name_text = self._name_text + "\n" + new_text if self._name_text else new_text
+
+    def _prefix_range(self, prefix):
+        # Distinct tags starting with prefix, a slice of the sorted tags
+        lo = bisect.bisect_left(self._sorted_tags, prefix)
+        hi = bisect.bisect_left(self._sorted_tags, prefix + "\U0010ffff")
+        return self._sorted_tags[lo:hi]
+
+    def search(self, query):
+        """
+        Positions whose basename or one of whose tags contains query, as an
+        ascending array. Tags starting with query are found by bisection,
+        other tags and basenames containing it with one scan of their
+        joined text. A query matching a large share of the basenames, where
+        the result is most of the library anyway, is answered in one pass
+        over the positions instead.
+        """
+        query = query.lower()
+        if not query or "\n" in query:
+            return array("I", range(len(self.paths)) if not query else ())
+        with self._lock:
+            self._vocabulary()
+            tags, names = self._sorted_tags, self._names
+            matching = set(self._prefix_range(query))
+            hits = _entries_containing(self._tag_text, self._tag_starts, query, len(tags) * DENSE_MATCH)
+            if hits is None:
+                matching.update(tag for tag in tags if query in tag)
+            else:
+                matching.update(tags[k] for k in hits)
+            hits = _entries_containing(self._name_text, self._name_starts, query, len(names) * DENSE_MATCH)
+            if hits is None:
+                found = [query in name for name in self.names]
+                # Only the few positions whose basename missed need their tags checked
+                for pos in compress(range(len(found)), map(operator.not_, found)):
+                    pos_tags = self.tags[pos]
+                    if pos_tags and not matching.isdisjoint(pos_tags):
+                        found[pos] = True
+                return array("I", compress(range(len(found)), found))
+            positions = set(chain.from_iterable(self.postings[tag] for tag in matching))
+            positions.update(chain.from_iterable(self.name_postings[names[k]] for k in hits))
+        return array("I", sorted(positions))
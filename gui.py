@@ -1,8 +1,24 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-import json
-from core import scanner, indexer, mapper, editor, generator, logger
+import queue
+import bisect
+import threading
+import tkinter.font as tkfont
+from concurrent.futures import ThreadPoolExecutor, wait
+from core import scanner, mapper, editor, generator, logger
+from core.tag_index import TagIndex
+from core.catalog import open_catalog
+from core.config_reader import load_existing_attributes
+
+SEARCH_DEBOUNCE_MS = 200
+INDEX_POLL_MS = 250
+IO_POLL_MS = 50
+LOAD_WORKERS = 4
+SCAN_POLL_MS = 100
+SCAN_CHUNK = 1000
+LOG_POLL_MS = 100
+VOCAB_CHECK_MS = 2000
 
 class AutocompleteCombobox(ttk.Combobox):
     def set_completion_list(self, completion_list):
@@ -39,6 +55,106 @@ class AutocompleteCombobox(ttk.Combobox):
         else:
             self.autocomplete()
 
+class VirtualListbox(ttk.Frame):
+    """
+    Listbox that only holds the rows currently on screen, so a list of any
+    length costs the same to show and scroll. items is any sequence (a
+    range or an array of positions works) and label(item) gives the text
+    of a row; nothing is copied. The selection is an index into items and
+    on_select(index) is called when the user changes it.
+    """
+
+    def __init__(self, master, label=str, height=10, on_select=None):
+        super().__init__(master)
+        self.label = label
+        self.on_select = on_select
+        self.items = ()
+        self.top = 0
+        self.selected = None
+        self.listbox = tk.Listbox(self, height=height, activestyle='none', exportselection=False)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.yview)
+        self.listbox.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+        self.line_height = tkfont.Font(font=self.listbox.cget('font')).metrics('linespace') + 1
+
+        self.listbox.bind('<Configure>', lambda e: self.render())
+        self.listbox.bind('<<ListboxSelect>>', self.on_click)
+        self.listbox.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.listbox.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.listbox.bind('<Button-5>', lambda e: self.scroll(3))
+        for key, step in (('<Up>', -1), ('<Down>', 1)):
+            self.listbox.bind(key, lambda e, step=step: self.move(step))
+        self.listbox.bind('<Prior>', lambda e: self.move(-self.visible_rows()))
+        self.listbox.bind('<Next>', lambda e: self.move(self.visible_rows()))
+        self.listbox.bind('<Home>', lambda e: self.move(-len(self.items)))
+        self.listbox.bind('<End>', lambda e: self.move(len(self.items)))
+
+    def visible_rows(self):
+        return max(1, self.listbox.winfo_height() // self.line_height)
+
+    def set_items(self, items, selected=None):
+        """Show items, keeping the scroll position; selected is an index into items or None."""
+        self.items = items
+        self.selected = selected
+        if selected is not None:
+            self.see(selected)
+        self.render()
+
+    def render(self):
+        rows = self.visible_rows()
+        count = len(self.items)
+        self.top = max(0, min(self.top, count - rows))
+        # One row past the window so a partly visible last row isn't left blank
+        stop = min(self.top + rows + 1, count)
+        self.listbox.delete(0, tk.END)
+        if stop > self.top:
+            self.listbox.insert(tk.END, *[self.label(self.items[i]) for i in range(self.top, stop)])
+        if self.selected is not None and self.top <= self.selected < stop:
+            self.listbox.selection_set(self.selected - self.top)
+        if count:
+            self.scrollbar.set(self.top / count, min(self.top + rows, count) / count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.items))
+            self.render()
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (self.visible_rows() if args[2] == 'pages' else 1)
+            self.scroll(step)
+
+    def scroll(self, step):
+        self.top += step
+        self.render()
+        return 'break'
+
+    def see(self, index):
+        rows = self.visible_rows()
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + rows:
+            self.top = index - rows + 1
+
+    def select(self, index):
+        self.selected = index
+        self.see(index)
+        self.render()
+        if self.on_select is not None:
+            self.on_select(index)
+
+    def move(self, step):
+        if self.items:
+            current = self.top if self.selected is None else self.selected
+            self.select(max(0, min(current + step, len(self.items) - 1)))
+        return 'break'
+
+    def on_click(self, event):
+        selection = self.listbox.curselection()
+        if selection and self.top + selection[0] != self.selected:
+            self.select(self.top + selection[0])
+
+
 class TagEditorGUI(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -52,11 +168,45 @@ class TagEditorGUI(tk.Tk):
         self.create_widgets()
         self.current_folder = None
         self.xmp_files = []
-        self.filtered_files = []
-        self.current_file_index = None
-
-        # Redirect logger output to GUI log panel
-        logger.set_log_callback(self.append_log)
+        # Positions into xmp_files that pass the current search: a range when
+        # unfiltered, otherwise an array from TagIndex.search
+        self.filtered_positions = range(0)
+        self.current_pos = None
+        self.tag_index = TagIndex()
+        self.index_stop = threading.Event()
+        self.filter_job = None
+        self.scan_stop = threading.Event()
+        self.scan_done = threading.Event()
+        self.scan_thread = None
+        self.catalog = None
+
+        # File I/O runs off the Tk thread: loads on a small pool, saves on a
+        # single worker so writes happen in the order they were requested.
+        self.load_executor = ThreadPoolExecutor(max_workers=LOAD_WORKERS)
+        self.save_executor = ThreadPoolExecutor(max_workers=1)
+        self.background_jobs = []
+        self.io_poll_job = None
+        self.pending_saves = {}
+        self.current_xmp_path = None
+        self.select_token = 0
+        self.status_error = None
+
+        # Redirect logger output to GUI log panel. Messages can come from
+        # worker threads, so they are queued and drained on the Tk thread.
+        self.log_queue = queue.SimpleQueue()
+        logger.set_log_callback(self.log_queue.put)
+        self.after(LOG_POLL_MS, self.poll_log_queue)
+        self.after(VOCAB_CHECK_MS, self.check_vocabulary)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        self.scan_stop.set()
+        self.index_stop.set()
+        self.release_catalog()
+        # Let queued saves, and the catalog close behind them, finish first
+        self.save_executor.shutdown(wait=True)
+        self.load_executor.shutdown(wait=False)
+        self.destroy()
 
     def create_widgets(self):
         # Folder and search frame
@@ -79,10 +229,15 @@ class TagEditorGUI(tk.Tk):
         files_frame = ttk.Frame(self)
         files_frame.pack(fill='both', expand=False, padx=10, pady=5)
 
-        ttk.Label(files_frame, text="XMP Files:").pack(anchor='w')
-        self.file_listbox = tk.Listbox(files_frame, height=10)
-        self.file_listbox.pack(fill='both', expand=True)
-        self.file_listbox.bind("<<ListboxSelect>>", self.on_file_select)
+        files_header = ttk.Frame(files_frame)
+        files_header.pack(fill='x')
+        ttk.Label(files_header, text="XMP Files:").pack(side='left')
+        self.cancel_scan_btn = ttk.Button(files_header, text="Cancel Scan", command=self.cancel_scan)
+        self.scan_progress = ttk.Progressbar(files_header, mode='indeterminate', length=120)
+        self.scan_var = tk.StringVar()
+        ttk.Label(files_header, textvariable=self.scan_var).pack(side='right', padx=5)
+        self.file_list = VirtualListbox(files_frame, label=self.file_label, height=10, on_select=self.on_file_select)
+        self.file_list.pack(fill='both', expand=True)
 
         # Attributes frame with scroll
         attr_outer = ttk.Frame(self)
@@ -117,6 +272,9 @@ class TagEditorGUI(tk.Tk):
         save_frame = ttk.Frame(self)
         save_frame.pack(fill='x', padx=10, pady=5)
         ttk.Button(save_frame, text="Save Config", command=self.save_config).pack(side='right')
+        self.status_var = tk.StringVar(value="Ready")
+        self.status_label = ttk.Label(save_frame, textvariable=self.status_var)
+        self.status_label.pack(side='left')
 
         # Logs panel
         logs_frame = ttk.LabelFrame(self, text="Logs")
@@ -130,6 +288,25 @@ class TagEditorGUI(tk.Tk):
         self.log_text.see(tk.END)
         self.log_text.configure(state='disabled')
 
+    def poll_log_queue(self):
+        messages = []
+        while True:
+            try:
+                messages.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if messages:
+            self.append_log("\n".join(messages))
+        self.after(LOG_POLL_MS, self.poll_log_queue)
+
+    def check_vocabulary(self):
+        """Refresh the attribute choices when attributes.yaml is edited while the editor is open."""
+        if mapper.reload_if_changed(0):
+            self.attributes_yaml = mapper.load_attribute_yaml()
+            for key, combo in self.attr_widgets.items():
+                combo.set_completion_list(self.attributes_yaml.get(key, []))
+        self.after(VOCAB_CHECK_MS, self.check_vocabulary)
+
     def browse_folder(self):
         folder = filedialog.askdirectory()
         if folder:
@@ -137,82 +314,278 @@ class TagEditorGUI(tk.Tk):
             self.load_files(folder)
 
     def load_files(self, folder):
+        # Abort a scan of the previously chosen folder before starting this one
+        self.scan_stop.set()
+        self.scan_stop = threading.Event()
+        self.scan_done = threading.Event()
         self.current_folder = folder
-        self.xmp_files = scanner.find_xmp_files(folder)
-        self.filtered_files = self.xmp_files.copy()
+        self.release_catalog()
+        # A catalog left by a CLI run over this folder saves re-parsing unchanged sidecars
+        self.catalog = open_catalog(folder)
+        self.xmp_files = []
+        self.filtered_positions = range(0)
+        self.current_pos = None
         self.update_file_listbox()
+        self.start_tag_index()
+
+        results = queue.SimpleQueue()
+        self.scan_thread = threading.Thread(
+            target=self.scan_worker, args=(folder, self.scan_stop, results, self.catalog), daemon=True
+        )
+        self.scan_thread.start()
+        self.scan_var.set("Scanning...")
+        self.scan_progress.pack(side='right')
+        self.cancel_scan_btn.pack(side='right', padx=5)
+        self.scan_progress.start()
+        self.after(SCAN_POLL_MS, self.poll_scan, self.scan_stop, results)
+
+    def release_catalog(self):
+        """
+        Close the current catalog once its scan worker has stopped and the
+        loads and saves already started, which may still use it, are done.
+        """
+        catalog = self.catalog
+        if catalog is None:
+            return
+        self.catalog = None
+        scan_thread = self.scan_thread
+        jobs = [future for future, _, _ in self.background_jobs]
+
+        def close():
+            if scan_thread is not None:
+                scan_thread.join()
+            wait(jobs)
+            catalog.close()
+
+        # On the save worker, so it also runs after every save queued so far
+        self.save_executor.submit(close)
+
+    def scan_worker(self, folder, stop, results, catalog=None):
+        """
+        Walk folder on a background thread, handing sidecar paths over in
+        chunks along with whatever the catalog recorded for them.
+        """
+        chunk = []
+        known = {}
+        files = scanner.iter_xmp_files(folder)
+        try:
+            if catalog is not None:
+                known = catalog.sidecars_under(folder)
+            for path in files:
+                if stop.is_set():
+                    break
+                chunk.append(path)
+                if len(chunk) >= SCAN_CHUNK:
+                    results.put((chunk, {p: known[p] for p in chunk if p in known}))
+                    chunk = []
+        except Exception as e:
+            results.put(e)
+        finally:
+            files.close()
+            results.put((chunk, {p: known[p] for p in chunk if p in known}))
+            results.put(None)
+
+    def poll_scan(self, stop, results):
+        if stop is not self.scan_stop:
+            return  # a newer scan replaced this one
+        new_paths = []
+        known = {}
+        finished = False
+        while not finished:
+            try:
+                item = results.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                finished = True
+            elif isinstance(item, Exception):
+                logger.log(f"Scan of {self.current_folder} failed: {item}")
+            else:
+                new_paths.extend(item[0])
+                known.update(item[1])
+
+        if new_paths:
+            start = len(self.xmp_files)
+            self.xmp_files.extend(new_paths)
+            self.tag_index.extend(new_paths)
+            # Catalogued tags count as indexed; the indexer re-parses a sidecar only if its mtime moved
+            for pos, path in enumerate(new_paths, start):
+                entry = known.get(path)
+                if entry is not None:
+                    self.tag_index.update(pos, entry[2], entry[1])
+            if self.search_var.get():
+                self.apply_filter()
+            else:
+                self.filtered_positions = range(len(self.xmp_files))
+                self.update_file_listbox()
+
+        if stop.is_set():
+            self.end_scan(f"Scan cancelled: {len(self.xmp_files)} files")
+        elif finished:
+            self.end_scan(f"{len(self.xmp_files)} files")
+        else:
+            self.scan_var.set(f"Scanning... {len(self.xmp_files)} files")
+            self.after(SCAN_POLL_MS, self.poll_scan, stop, results)
+
+    def end_scan(self, message):
+        # No more paths are coming, so the tag index can finish once it catches up
+        self.scan_done.set()
+        self.scan_progress.stop()
+        self.scan_progress.pack_forget()
+        self.cancel_scan_btn.pack_forget()
+        self.scan_var.set(message)
+        logger.log(f"{message} in {self.current_folder}")
+
+    def cancel_scan(self):
+        self.scan_stop.set()
+
+    def start_tag_index(self):
+        # Stop indexing the previous folder before starting on the new one
+        self.index_stop.set()
+        self.index_stop = threading.Event()
+        self.tag_index = TagIndex(self.xmp_files)
+        threading.Thread(
+            target=self.tag_index.build, args=(self.index_stop, 0, self.scan_done), daemon=True
+        ).start()
+        self.after(INDEX_POLL_MS, self.poll_tag_index, self.tag_index, self.scan_done, 0)
+
+    def poll_tag_index(self, index, scan_done, last_count):
+        if index is not self.tag_index:
+            return
+        # Re-run an active search as more tags become searchable
+        if index.indexed != last_count and self.search_var.get():
+            self.apply_filter()
+        if index.indexed < len(index) or not scan_done.is_set():
+            self.after(INDEX_POLL_MS, self.poll_tag_index, index, scan_done, index.indexed)
+        else:
+            logger.log(f"Tag index ready: {len(index)} sidecars")
+
+    def file_label(self, pos):
+        return os.path.basename(self.xmp_files[pos])
 
     def update_file_listbox(self):
-        self.file_listbox.delete(0, tk.END)
-        for f in self.filtered_files:
-            self.file_listbox.insert(tk.END, os.path.basename(f))
-        self.clear_attributes()
+        # Keep the selected file selected if it still passes the filter
+        selected = None
+        if self.current_pos is not None:
+            i = bisect.bisect_left(self.filtered_positions, self.current_pos)
+            if i < len(self.filtered_positions) and self.filtered_positions[i] == self.current_pos:
+                selected = i
+        self.file_list.set_items(self.filtered_positions, selected)
+        if selected is None:
+            self.current_pos = None
+            self.current_xmp_path = None
+            self.clear_attributes()
 
     def filter_file_list(self, *args):
+        # Debounce keystrokes so a burst of typing runs one search
+        if self.filter_job is not None:
+            self.after_cancel(self.filter_job)
+        self.filter_job = self.after(SEARCH_DEBOUNCE_MS, self.apply_filter)
+
+    def apply_filter(self):
+        self.filter_job = None
         query = self.search_var.get().lower()
         if not query:
-            self.filtered_files = self.xmp_files.copy()
+            self.filtered_positions = range(len(self.xmp_files))
         else:
-            self.filtered_files = []
-            for f in self.xmp_files:
-                filename = os.path.basename(f).lower()
-                if query in filename:
-                    self.filtered_files.append(f)
-                    continue
-                # Try to load tags and check for query match
-                raw_tags = indexer.get_tags_from_xmp(f)
-                tags_str = " ".join(raw_tags).lower()
-                if query in tags_str:
-                    self.filtered_files.append(f)
+            self.filtered_positions = self.tag_index.search(query)
         self.update_file_listbox()
 
     def clear_attributes(self):
         for combo in self.attr_widgets.values():
             combo.set('')
 
-    def on_file_select(self, event):
-        selection = self.file_listbox.curselection()
-        if not selection:
-            return
-        index = selection[0]
-        xmp_path = self.filtered_files[index]
-        self.current_file_index = index
+    def on_file_select(self, index):
+        pos = self.filtered_positions[index]
+        xmp_path = self.xmp_files[pos]
+        self.current_pos = pos
+        self.current_xmp_path = xmp_path
+        self.select_token += 1
+        token = self.select_token
 
-        raw_tags = indexer.get_tags_from_xmp(xmp_path)
-        mapped_tags = mapper.map_tags(raw_tags)
-        existing_attrs = self.load_existing_attributes(os.path.dirname(xmp_path))
-        mapped_tags.update(existing_attrs)
+        folder = os.path.dirname(xmp_path)
+        # Reads of a folder with a save in flight queue behind that save
+        executor = self.save_executor if self.pending_saves.get(folder) else self.load_executor
+        self.run_in_background(
+            executor, self.load_file_attributes, self.tag_index, pos, folder,
+            on_done=lambda attrs: self.show_attributes(token, attrs),
+            on_error=lambda e: logger.log(f"Failed to load {xmp_path}: {e}"),
+        )
 
+    def load_file_attributes(self, tag_index, pos, folder):
+        """Worker-thread half of on_file_select: tags, hard mapping and existing config."""
+        # Reuse indexed tags unless the sidecar changed on disk
+        tag_index.refresh(pos)
+        mapped_tags = mapper.map_tags(tag_index.tags[pos] or [])
+        catalog = self.catalog
+        if catalog is not None:
+            mapped_tags.update(catalog.read_existing(folder, load_existing_attributes))
+        else:
+            mapped_tags.update(load_existing_attributes(folder))
+        return mapped_tags
+
+    def write_config(self, folder, attributes):
+        """Save-worker half of save_config."""
+        written = generator.generate_config(folder, attributes)
+        catalog = self.catalog
+        if catalog is not None:
+            catalog.record_config(folder, attributes)
+        return written
+
+    def show_attributes(self, token, mapped_tags):
+        if token != self.select_token:
+            return  # the selection moved on while this was loading
         for key in self.required_keys:
             values = mapped_tags.get(key, [])
             combo = self.attr_widgets[key]
             combo.set(", ".join(values) if values else '')
 
-    def load_existing_attributes(self, folder):
-        config_path = os.path.join(folder, "config.orynt3d")
-        if not os.path.isfile(config_path):
-            return {}
-        try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            attr_list = data.get("modelmeta", {}).get("attributes", [])
-            attr_dict = {}
-            for item in attr_list:
-                k = item.get("key")
-                v = item.get("value")
-                if k and v:
-                    attr_dict.setdefault(k, []).append(v)
-            return attr_dict
-        except Exception as e:
-            logger.log(f"Failed to load existing config attributes: {e}")
-            return {}
+    def run_in_background(self, executor, fn, *args, on_done=None, on_error=None):
+        future = executor.submit(fn, *args)
+        self.background_jobs.append((future, on_done, on_error))
+        if self.io_poll_job is None:
+            self.io_poll_job = self.after(IO_POLL_MS, self.poll_background_jobs)
+        self.update_status()
+        return future
+
+    def poll_background_jobs(self):
+        running = []
+        for future, on_done, on_error in self.background_jobs:
+            if not future.done():
+                running.append((future, on_done, on_error))
+                continue
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+            elif on_done:
+                on_done(future.result())
+        self.background_jobs = running
+        self.io_poll_job = self.after(IO_POLL_MS, self.poll_background_jobs) if running else None
+        self.update_status()
+
+    def update_status(self, error=None):
+        saving = sum(self.pending_saves.values())
+        loading = len(self.background_jobs) - saving
+        if error:
+            self.status_error = error
+        parts = []
+        if saving:
+            parts.append(f"Saving {saving}...")
+        if loading > 0:
+            parts.append("Loading...")
+        if self.status_error:
+            # Keep the last failure visible until the user saves again
+            parts.insert(0, self.status_error)
+        self.status_var.set(" ".join(parts) or "Ready")
+        self.status_label.configure(foreground='red' if self.status_error else '')
 
     def save_config(self):
-        if self.current_file_index is None:
+        if self.current_xmp_path is None:
             messagebox.showwarning("No file selected", "Please select an XMP file to save.")
             return
 
-        xmp_path = self.filtered_files[self.current_file_index]
+        xmp_path = self.current_xmp_path
         folder = os.path.dirname(xmp_path)
 
         edited_tags = {}
@@ -233,9 +606,26 @@ class TagEditorGUI(tk.Tk):
 
         # Optional: hook to your editor.py
         edited_tags = editor.edit_tags(edited_tags)
-        generator.generate_config(folder, edited_tags)
-        logger.log(f"Config file saved for {folder}")
-        messagebox.showinfo("Success", f"Config file saved for:\n{folder}")
+        self.status_error = None
+        self.pending_saves[folder] = self.pending_saves.get(folder, 0) + 1
+        self.run_in_background(
+            self.save_executor, self.write_config, folder, edited_tags,
+            on_done=lambda written: self.save_finished(folder, written, None),
+            on_error=lambda e: self.save_finished(folder, None, e),
+        )
+
+    def save_finished(self, folder, written, error):
+        self.pending_saves[folder] -= 1
+        if not self.pending_saves[folder]:
+            del self.pending_saves[folder]
+        if error is not None:
+            logger.log(f"Failed to save config for {folder}: {error}")
+            self.update_status(error=f"Save failed: {folder}")
+            messagebox.showerror("Save failed", f"Could not save config for:\n{folder}\n\n{error}")
+        elif written:
+            logger.log(f"Config file saved for {folder}")
+        else:
+            logger.log(f"Config file for {folder} already up to date")
 
 def main():
     app = TagEditorGUI()
@@ -1,79 +1,81 @@
 # main.py
 from core import scanner, indexer, mapper, editor, generator, logger
+from core import semantic, config_reader
+from core.manifest import Manifest
+from core.catalog import Catalog, catalog_path, HARD, SEMANTIC
+from core.config_reader import load_existing_attributes
+from core.pipeline import Pipeline
+from core.netio import RemoteIO, IO_CONCURRENCY, READ_AHEAD, RETRIES
+from core.journal import RunJournal, journal_path, WRITTEN, UNCHANGED, DEFERRED
+from core.review_queue import ReviewQueueWriter, UnattendedPolicy, POLICIES, MIN_CONFIDENCE
+from core.semantic import semantic_map_batch, SEMANTIC_BATCH_SIZE
 import os
-import json
-
-import openai
-from sentence_transformers import SentenceTransformer, util
-
-# Load the embedding model once
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-
-# Build attribute index for semantic search
-attribute_index = {}
-attribute_phrases = []
-attribute_lookup = []
-
-attribute_yaml = mapper.load_attribute_yaml()
-for key, values in attribute_yaml.items():
-    for v in values:
-        phrase = f"{key}: {v}"
-        attribute_phrases.append(phrase)
-        attribute_lookup.append((key, v))
-
-attribute_embeddings = embedding_model.encode(attribute_phrases, convert_to_tensor=True)
-
-def semantic_map(raw_tags):
-    enriched = {}
-    for tag in raw_tags:
-        tag_embedding = embedding_model.encode(tag, convert_to_tensor=True)
-        cosine_scores = util.pytorch_cos_sim(tag_embedding, attribute_embeddings)[0]
-        top_score, top_idx = cosine_scores.max(0)
-        if top_score.item() > 0.55:
-            k, v = attribute_lookup[top_idx.item()]
-            enriched.setdefault(k, []).append(v)
-    return enriched
-
-def load_existing_attributes(folder):
-    config_path = os.path.join(folder, "config.orynt3d")
-    if not os.path.isfile(config_path):
-        return {}
-    try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        attr_list = data.get("modelmeta", {}).get("attributes", [])
-        attr_dict = {}
-        for item in attr_list:
-            k = item.get("key")
-            v = item.get("value")
-            if k and v:
-                attr_dict.setdefault(k, []).append(v)
-        return attr_dict
-    except Exception as e:
-        logger.log(f"Failed to load existing config attributes: {e}")
-        return {}
-
-def process_folder(xmp_file):
-    folder = os.path.dirname(xmp_file)
-    logger.log(f"Processing folder: {folder}")
-    raw_tags = indexer.get_tags_from_xmp(xmp_file)
-    logger.log(f"Raw tags from sidecar: {raw_tags}")
+import argparse
+from functools import partial
+from itertools import islice
+
+def read_tags(xmp_file, catalog=None, remote=None):
+    parse = remote.read_tags if remote is not None else indexer.get_tags_from_xmp
+    if catalog is None:
+        return parse(xmp_file)
+    return catalog.read_tags(xmp_file, parse)
+
+def read_folder_tags(xmp_files, catalog=None, remote=None):
+    """Union of the tags of every sidecar in a folder, most common first."""
+    _, tags, counts = indexer.get_folder_tags(xmp_files, lambda xmp_file: read_tags(xmp_file, catalog, remote))
+    logger.debug("Tag counts over %d sidecars: %s", len(xmp_files), counts)
+    return tags
+
+def read_existing_attributes(folder, catalog=None, remote=None):
+    load = remote.load_existing_attributes if remote is not None else load_existing_attributes
+    if catalog is None:
+        return load(folder)
+    return catalog.read_existing(folder, load)
+
+def process_folder(folder, xmp_files, raw_tags=None, semantic_tags=None, semantic_scores=None, policy=None,
+                   catalog=None, remote=None):
+    """
+    Map, review and write one folder from the union of its sidecars' tags.
+    With an UnattendedPolicy the prompts are replaced by the policy and the
+    folder may be deferred instead. With a Catalog, tags and the existing
+    config come from it when fresh and the results are recorded in it.
+    With a netio.RemoteIO, files are read through it. Returns the outcome
+    (journal.WRITTEN, UNCHANGED or DEFERRED) and the attributes written.
+    """
+    logger.info("Processing folder: %s (%d sidecars)", folder, len(xmp_files))
+    if raw_tags is None:
+        with logger.span("parse", items=len(xmp_files)):
+            raw_tags = read_folder_tags(xmp_files, catalog, remote)
+    logger.debug("Raw tags from sidecars: %s", raw_tags)
 
     # Map raw tags using both hard mapping and semantic mapping
-    mapped_tags = mapper.map_tags(raw_tags)
-    semantic_tags = semantic_map(raw_tags)
-    for k, vlist in semantic_tags.items():
-        for v in vlist:
-            mapped_tags.setdefault(k, []).append(v)
-    logger.log(f"Mapped attributes before merging existing config: {mapped_tags}")
+    with logger.span("map"):
+        mapped_tags = mapper.map_tags(raw_tags)
+    hard_keys = set(mapped_tags)
+    if semantic_tags is None:
+        with logger.span("semantic"):
+            semantic_tags, semantic_scores = semantic_map_batch([raw_tags], with_scores=True)[0]
+    if catalog is not None:
+        catalog.record_attributes(folder, HARD, mapped_tags)
+        catalog.record_attributes(folder, SEMANTIC, semantic_tags)
+    mapper.merge_semantic(mapped_tags, semantic_tags)
+    logger.debug("Mapped attributes before merging existing config: %s", mapped_tags)
 
     # Load existing config attributes and overwrite raw tag mapping with them
-    existing_attrs = load_existing_attributes(folder)
-    logger.log(f"Existing config attributes: {existing_attrs}")
+    with logger.span("parse", items=0):
+        existing_attrs = read_existing_attributes(folder, catalog, remote)
+    logger.debug("Existing config attributes: %s", existing_attrs)
     mapped_tags.update(existing_attrs)
-    logger.log(f"Mapped attributes after merging with priority to existing config: {mapped_tags}")
+    logger.debug("Mapped attributes after merging with priority to existing config: %s", mapped_tags)
+
+    if policy is not None:
+        resolved = policy.resolve(folder, mapped_tags, hard_keys, existing_attrs, semantic_scores)
+        if resolved is None:
+            return DEFERRED, None
+        return write_config(folder, resolved, catalog), resolved
 
     required_keys = mapper.get_required_keys()
+    logger.flush()  # buffered log lines must not land in the middle of the prompts
 
     for key in required_keys:
         current_value = mapped_tags.get(key)
@@ -90,16 +92,218 @@ def process_folder(xmp_file):
                 mapped_tags[key] = [v.strip() for v in new_value.split(",") if v.strip()]
 
     edited_tags = editor.edit_tags(mapped_tags)
-    logger.log(f"Edited attributes: {edited_tags}")
+    logger.debug("Edited attributes: %s", edited_tags)
+    return write_config(folder, edited_tags, catalog), edited_tags
+
+def write_config(folder, attributes, catalog=None):
+    with logger.span("write"):
+        written = generator.generate_config(folder, attributes)
+        if catalog is not None:
+            catalog.record_config(folder, attributes)
+    if written:
+        logger.count("configs written")
+        logger.info("Config file generated.")
+        return WRITTEN
+    logger.count("configs unchanged")
+    logger.info("Config file unchanged, not rewritten.")
+    return UNCHANGED
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Orynt3D config files from XMP sidecar tags.")
+    parser.add_argument("root", nargs="?", default="K:/Model Repo/Loot Studios",
+                        help="Library root to scan for .xmp sidecars")
+    parser.add_argument("--batch-size", type=int, default=SEMANTIC_BATCH_SIZE,
+                        help="Number of folders whose tags are semantically mapped per encode batch")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process sidecars that are new or changed since the last run")
+    parser.add_argument("--manifest", default=None,
+                        help="Manifest file used by --incremental (default: <root>/.orynt3d_manifest.json)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Run unattended as a parse -> semantic -> write pipeline (no prompts)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                        help="Parse-stage worker count for --pipeline")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="Parse-stage pool type for --pipeline")
+    parser.add_argument("--queue-size", type=int, default=1024,
+                        help="Maximum items buffered between pipeline stages")
+    parser.add_argument("--headless", action="store_true",
+                        help="Never prompt; resolve missing or low-confidence keys with --policy")
+    parser.add_argument("--policy", choices=POLICIES, default="defer",
+                        help="Headless handling of missing or low-confidence keys")
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE,
+                        help="Semantic-only keys scoring below this are low-confidence")
+    parser.add_argument("--require", default=None,
+                        help="Comma-separated keys that must be present, for --policy defer "
+                             "(default: required keys that exist in attributes.yaml)")
+    parser.add_argument("--review-queue", default=None,
+                        help="Where deferred folders are queued (default: <root>/review_queue.jsonl)")
+    parser.add_argument("--catalog", action="store_true",
+                        help="Read tags and existing configs from the library catalog when fresh, and keep it updated")
+    parser.add_argument("--catalog-file", default=None,
+                        help="Catalog database used by --catalog (default: <root>/.orynt3d_catalog.sqlite)")
+    parser.add_argument("--log-level", choices=["debug", "info", "warning", "error"], default="info",
+                        help="Lowest level of message to show; debug includes per-folder attribute dumps")
+    parser.add_argument("--log-file", default=None,
+                        help="Also write log messages to this file")
+    parser.add_argument("--remote", action="store_true",
+                        help="Library is on a network share: bound concurrent I/O, read ahead and retry transient errors")
+    parser.add_argument("--io-concurrency", type=int, default=IO_CONCURRENCY,
+                        help="Maximum file operations in flight with --remote")
+    parser.add_argument("--read-ahead", type=int, default=READ_AHEAD,
+                        help="Folders whose sidecars and config are read in advance with --remote")
+    parser.add_argument("--io-retries", type=int, default=RETRIES,
+                        help="Retries of an operation failing with a transient error with --remote")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run, skipping folders its journal records as done")
+    parser.add_argument("--journal", default=None,
+                        help="Run journal (default: <root>/.orynt3d_journal.jsonl)")
+    return parser.parse_args(argv)
+
+def iter_pending_folders(root, manifest=None, remote=None, journal=None):
+    """
+    Yield (folder, sidecars) to process, every sidecar of a folder
+    together. With a manifest, folders whose sidecars and config are all
+    unchanged are skipped, and with a resumed journal, folders it records
+    as done; neither has its files read. With a RemoteIO, directories are
+    listed through it and the files of upcoming folders are read ahead.
+    """
+    if remote is None:
+        folders = logger.timed_iter("scan", scanner.iter_folder_sidecars(root))
+    else:
+        folders = logger.timed_iter("scan", scanner.iter_folder_sidecars(root, remote.concurrency, remote.scan_dir))
+    folders = _pending_folders(folders, manifest)
+    if journal is not None and journal.completed:
+        folders = _unjournaled_folders(folders, journal)
+    return remote.read_ahead(folders) if remote is not None else folders
 
-    generator.generate_config(folder, edited_tags)
-    logger.log("Config file generated.")
+def _unjournaled_folders(folders, journal):
+    for folder, xmp_files in folders:
+        if journal.is_done(folder):
+            logger.count("folders already done")
+        else:
+            yield folder, xmp_files
+
+def _pending_folders(folders, manifest):
+    if manifest is None:
+        yield from folders
+        return
+    for folder, xmp_files, changes in manifest.folder_changes(folders):
+        for status, xmp_file in changes:
+            if status == "deleted":
+                logger.info("Sidecar removed since last run: %s", xmp_file)
+                manifest.purge([xmp_file])
+            else:
+                logger.debug("Sidecar %s: %s", status, xmp_file)
+            logger.count(f"sidecars {status}")
+        if xmp_files:
+            yield folder, xmp_files
+
+def complete_folder(manifest, journal, remote, folder, xmp_files, outcome, attributes):
+    """Record a finished folder in the manifest and the run journal, and drop any reads it didn't need."""
+    if remote is not None:
+        remote.release(folder)
+    if manifest is not None:
+        for xmp_file in xmp_files:
+            manifest.record(xmp_file)
+    if journal is not None:
+        journal.record(folder, outcome, generator.config_sha1(attributes) if attributes is not None else None)
+
+def open_journal(args):
+    path = args.journal or journal_path(args.root)
+    try:
+        return RunJournal(path, os.path.abspath(args.root), resume=args.resume)
+    except OSError as e:
+        if args.resume:
+            raise SystemExit(f"Cannot resume, run journal {path} unavailable: {e}")
+        logger.warning("Running without a journal, %s could not be opened: %s", path, e)
+        return None
 
-def main():
-    root = "K:/Model Repo/Loot Studios"
-    xmp_files = scanner.find_xmp_files(root)
-    for xmp_file in xmp_files:
-        process_folder(xmp_file)
+def main(argv=None):
+    args = parse_args(argv)
+    # Unattended runs print a lot and nobody answers prompts, so their output can be buffered
+    logger.configure(level=getattr(logger, args.log_level.upper()), log_file=args.log_file,
+                     buffered=args.headless or args.pipeline)
+    logger.metrics.reset()
+    manifest = None
+    if args.incremental:
+        manifest = Manifest(args.manifest or os.path.join(args.root, ".orynt3d_manifest.json"))
+    catalog = None
+    if args.catalog:
+        catalog = Catalog(args.catalog_file or catalog_path(args.root))
+    journal = open_journal(args)
+    remote = None
+    if args.remote:
+        remote = RemoteIO(args.io_concurrency, args.read_ahead, args.io_retries)
+    policy = None
+    if args.headless:
+        queue = ReviewQueueWriter(args.review_queue or os.path.join(args.root, "review_queue.jsonl"))
+        required_keys = [k.strip() for k in args.require.split(",") if k.strip()] if args.require else None
+        policy = UnattendedPolicy(args.policy, required_keys, args.min_confidence, queue)
+    try:
+        run(args, manifest, policy, catalog, remote, journal)
+        if journal is not None:
+            journal.finish()
+    finally:
+        if journal is not None:
+            journal.close()
+        if remote is not None:
+            remote.close()
+            logger.info("Remote I/O: %d operations, %d retried", remote.operations, remote.retried)
+        if manifest is not None:
+            manifest.save()
+        if catalog is not None:
+            catalog.close()
+        if policy is not None:
+            policy.queue.save()
+            logger.info("%d folders deferred; review queue holds %d entries: %s",
+                        policy.deferred, len(policy.queue), policy.queue.path)
+        logger.log_summary()
+
+def run(args, manifest=None, policy=None, catalog=None, remote=None, journal=None):
+    if catalog is not None and (args.headless or args.pipeline):
+        # Nobody is waiting on prompts, so commit the catalog in large transactions
+        with catalog.batch():
+            return _run(args, manifest, policy, catalog, remote, journal)
+    return _run(args, manifest, policy, catalog, remote, journal)
+
+def _run(args, manifest=None, policy=None, catalog=None, remote=None, journal=None):
+    folders = iter_pending_folders(args.root, manifest, remote, journal)
+    on_complete = None
+    if manifest is not None or journal is not None or remote is not None:
+        on_complete = partial(complete_folder, manifest, journal, remote)
+    if args.pipeline:
+        if remote is not None:
+            # Remote reads share one concurrency limit, which process workers couldn't see
+            pipeline = Pipeline(remote.load_existing_attributes, workers=args.workers, executor="thread",
+                                batch_size=args.batch_size, queue_size=args.queue_size, policy=policy,
+                                catalog=catalog, read_tags=remote.read_tags)
+        else:
+            pipeline = Pipeline(load_existing_attributes, workers=args.workers, executor=args.executor,
+                                batch_size=args.batch_size, queue_size=args.queue_size, policy=policy,
+                                catalog=catalog)
+        pipeline.run(folders, on_complete=on_complete)
+        return
+    while True:
+        chunk = list(islice(folders, args.batch_size))
+        if not chunk:
+            break
+        if remote is not None:
+            remote.prefetch(chunk)
+        # Pick up edits to attributes.yaml made while a long run is going
+        mapper.reload_if_changed()
+        with logger.span("parse", items=sum(len(xmp_files) for _, xmp_files in chunk)):
+            raw_tag_lists = [read_folder_tags(xmp_files, catalog, remote) for _, xmp_files in chunk]
+            if catalog is None and remote is None:
+                # Read the chunk's configs concurrently; process_folder then finds them cached
+                config_reader.prefetch(folder for folder, _ in chunk)
+        with logger.span("semantic", items=len(chunk)):
+            semantic_lists = semantic_map_batch(raw_tag_lists, batch_size=args.batch_size, with_scores=True)
+        for (folder, xmp_files), raw_tags, (semantic_tags, semantic_scores) in zip(chunk, raw_tag_lists, semantic_lists):
+            outcome, attributes = process_folder(folder, xmp_files, raw_tags, semantic_tags, semantic_scores,
+                                                 policy, catalog, remote)
+            if on_complete is not None:
+                on_complete(folder, xmp_files, outcome, attributes)
+        semantic.flush()
 
 if __name__ == "__main__":
     main()
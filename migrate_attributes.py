@@ -0,0 +1,50 @@
+# migrate_attributes.py
+import time
+import argparse
+
+from core import logger
+from core.migrate import rename_rule, delete_rule, load_rules, migrate_library, MIGRATE_WORKERS
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rename, merge or delete attributes in every config.orynt3d of a library.",
+        epilog='Example: migrate_attributes.py LIBRARY --rename "held: dual-wield=held: melee" --delete theme --dry-run',
+    )
+    parser.add_argument("root", help="Library root to scan for config.orynt3d files")
+    parser.add_argument("--rules", default=None,
+                        help="YAML file with 'rename' (old: new) and 'delete' (list) sections")
+    parser.add_argument("--rename", action="append", default=[], metavar="OLD=NEW",
+                        help="'key: value=key: value' renames or merges a value, 'key=key' renames a key")
+    parser.add_argument("--delete", action="append", default=[], metavar="SPEC",
+                        help="'key: value' deletes one value, 'key' deletes the key")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Report what would change, per rule, without writing anything")
+    parser.add_argument("--workers", type=int, default=MIGRATE_WORKERS)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="Worker pool type; process parses JSON on every core")
+    parser.add_argument("--log-level", choices=["debug", "info", "warning", "error"], default="info",
+                        help="debug lists every config that changes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logger.configure(level=getattr(logger, args.log_level.upper()), buffered=True)
+    rules = load_rules(args.rules) if args.rules else []
+    for spec in args.rename:
+        old, sep, new = spec.partition("=")
+        if not sep:
+            raise SystemExit(f"--rename needs OLD=NEW: {spec!r}")
+        rules.append(rename_rule(old, new))
+    rules += [delete_rule(spec) for spec in args.delete]
+    if not rules:
+        raise SystemExit("No migration rules given; use --rules, --rename or --delete.")
+
+    logger.metrics.reset()
+    start = time.perf_counter()
+    report = migrate_library(args.root, rules, args.dry_run, args.workers, args.executor)
+    logger.metrics.add("migrate", report.scanned, time.perf_counter() - start)
+    report.log(args.dry_run)
+    logger.log_summary()
+
+if __name__ == "__main__":
+    main()
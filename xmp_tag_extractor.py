@@ -1,31 +1,17 @@
-import xml.etree.ElementTree as ET
 import sys
 
-def extract_xmp_tags(xmp_file_path):
-    ns = {
-        'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
-        'dc': 'http://purl.org/dc/elements/1.1/'
-    }
-
-    try:
-        tree = ET.parse(xmp_file_path)
-        root = tree.getroot()
-
-        # XPath to find tag elements inside dc:subject/rdf:Bag/rdf:li
-        subjects = root.findall(".//rdf:Description/dc:subject/rdf:Bag/rdf:li", ns)
+from core import indexer
 
-        if not subjects:
-            print(f"No tags found in {xmp_file_path}")
-            return
-
-        tags = [elem.text.strip().lower() for elem in subjects if elem.text]
+def extract_xmp_tags(xmp_file_path):
+    tags = [tag.strip() for tag in indexer.get_tags_from_xmp(xmp_file_path)]
 
-        print(f"Tags found in {xmp_file_path}:")
-        for tag in tags:
-            print(f"- {tag}")
+    if not tags:
+        print(f"No tags found in {xmp_file_path}")
+        return
 
-    except Exception as e:
-        print(f"Error parsing {xmp_file_path}: {e}")
+    print(f"Tags found in {xmp_file_path}:")
+    for tag in tags:
+        print(f"- {tag}")
 
 
 if __name__ == "__main__":